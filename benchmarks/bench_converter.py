@@ -0,0 +1,49 @@
+"""Compare the per-call cost of structuring and unstructuring a Stylespace with the
+shared, module-level converters against building a fresh converter for every call
+(the behaviour before the converters were shared).
+
+Run with `python benchmarks/bench_converter.py [path/to/file.stylespace]`.
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+import fontTools.misc.plistlib
+
+import statmake.classes
+from statmake.classes import Stylespace
+
+DEFAULT_STYLESPACE = Path(__file__).parent.parent / "tests" / "data" / "Test.stylespace"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stylespace", nargs="?", type=Path, default=DEFAULT_STYLESPACE)
+    parser.add_argument("--number", type=int, default=200)
+    parsed_args = parser.parse_args()
+
+    data = fontTools.misc.plistlib.loads(parsed_args.stylespace.read_bytes())
+    stylespace = Stylespace.from_dict(data)
+
+    def from_dict_fresh_converter() -> None:
+        converter = statmake.classes._make_converter(detailed_validation=False)
+        converter.structure(data, Stylespace)
+
+    def to_dict_fresh_converter() -> None:
+        converter = statmake.classes._make_converter(detailed_validation=False)
+        converter.unstructure(stylespace)
+
+    cases = {
+        "from_dict (fresh converter)": from_dict_fresh_converter,
+        "from_dict (shared converter)": lambda: Stylespace.from_dict(data),
+        "to_dict (fresh converter)": to_dict_fresh_converter,
+        "to_dict (shared converter)": stylespace.to_dict,
+    }
+    for name, function in cases.items():
+        seconds = min(timeit.repeat(function, number=parsed_args.number, repeat=5))
+        print(f"{name:<30} {seconds / parsed_args.number * 1e6:10.1f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
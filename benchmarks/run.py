@@ -0,0 +1,197 @@
+"""Time the phases of applying a synthetic Stylespace to a synthetic font and
+report the results as JSON, so that they can be compared between versions.
+
+Run with e.g. `python benchmarks/run.py --preset medium --output results.json`.
+The `large` preset is meant to show worst-case behaviour and can take a long time.
+"""
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import fontTools.otlLib.builder
+import fontTools.ttLib
+import synthetic
+
+import statmake
+import statmake.lib
+from statmake.classes import Stylespace
+
+
+def measure(
+    function: Callable[[Any], Any],
+    repeat: int,
+    setup: Callable[[], Any] = lambda: None,
+) -> Dict[str, Any]:
+    """Call function repeat times and return timing statistics in seconds.
+
+    setup is called untimed before each run and its return value is passed to
+    function.
+    """
+    runs: List[float] = []
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        function(argument)
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def run(fixture: synthetic.Fixture, repeat: int, cli: bool) -> Dict[str, Any]:
+    font_data = fixture.font_path.read_bytes()
+
+    def load_font() -> fontTools.ttLib.TTFont:
+        font = fontTools.ttLib.TTFont(io.BytesIO(font_data))
+        font.ensureDecompiled()
+        return font
+
+    stylespace = Stylespace.from_file(fixture.stylespace_path)
+    stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(stylespace)
+    name_to_tag = stylespace_index.name_to_tag
+    axes, locations, elided_fallback = statmake.lib._generate_builder_data(
+        stylespace, load_font(), {}
+    )
+
+    results: Dict[str, Any] = {
+        "Stylespace.from_file": measure(
+            lambda _: Stylespace.from_file(fixture.stylespace_path), repeat
+        ),
+        "Stylespace._validate": measure(lambda _: stylespace._validate(), repeat),
+        "lib.StylespaceIndex.from_stylespace": measure(
+            lambda _: statmake.lib.StylespaceIndex.from_stylespace(stylespace), repeat
+        ),
+        "lib._sanity_check": measure(
+            lambda font: statmake.lib._sanity_check(stylespace, font, {}, name_to_tag),
+            repeat,
+            load_font,
+        ),
+        "lib._axis_stops": measure(
+            lambda font: statmake.lib._axis_stops(
+                font, {}, name_to_tag, stylespace_index.stylespace_stops, None, []
+            ),
+            repeat,
+            load_font,
+        ),
+        "lib._generate_builder_data": measure(
+            lambda font: statmake.lib._generate_builder_data(stylespace, font, {}),
+            repeat,
+            load_font,
+        ),
+        "lib._generate_builder_data (with StylespaceIndex)": measure(
+            lambda font: statmake.lib._generate_builder_data(
+                stylespace, font, {}, stylespace_index
+            ),
+            repeat,
+            load_font,
+        ),
+        "buildStatTable": measure(
+            lambda font: fontTools.otlLib.builder.buildStatTable(
+                font, axes, locations, elided_fallback, macNames=False
+            ),
+            repeat,
+            load_font,
+        ),
+        "lib.apply_stylespace_to_variable_font": measure(
+            lambda font: statmake.lib.apply_stylespace_to_variable_font(
+                stylespace, font, {}, stylespace_index=stylespace_index
+            ),
+            repeat,
+            load_font,
+        ),
+    }
+
+    if cli:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = Path(tmp_dir) / "output.ttf"
+            command = [
+                sys.executable,
+                "-m",
+                "statmake",
+                "--designspace",
+                str(fixture.designspace_path),
+                "--output-path",
+                str(output_path),
+                str(fixture.font_path),
+            ]
+            results["cli"] = measure(
+                lambda _: subprocess.run(command, check=True), repeat
+            )
+            version_command = [sys.executable, "-m", "statmake", "--version"]
+            results["cli --version"] = measure(
+                lambda _: subprocess.run(
+                    version_command, check=True, stdout=subprocess.DEVNULL
+                ),
+                repeat,
+            )
+
+    results["_counts"] = {
+        "axes": len(stylespace.axes),
+        "stylespace_locations": sum(len(a.locations) for a in stylespace.axes),
+        "format4_locations": len(stylespace.locations),
+        "emitted_axis_values": sum(len(a["values"]) for a in axes),
+        "emitted_format4_locations": len(locations),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--preset", choices=sorted(synthetic.PRESETS), default="medium")
+    for field in synthetic.Parameters._fields:
+        parser.add_argument(
+            "--" + field.replace("_", "-"), type=int, help="Override the preset."
+        )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--no-cli", action="store_true", help="Skip the end-to-end CLI benchmark."
+    )
+    parser.add_argument(
+        "--fixture-dir",
+        type=Path,
+        help="Write the generated files here instead of a temporary directory.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the JSON report here.")
+    parsed_args = parser.parse_args()
+
+    parameters = synthetic.PRESETS[parsed_args.preset]._replace(
+        **{
+            field: getattr(parsed_args, field)
+            for field in synthetic.Parameters._fields
+            if getattr(parsed_args, field) is not None
+        }
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fixture_dir = parsed_args.fixture_dir or Path(tmp_dir)
+        try:
+            fixture = synthetic.write_fixture(fixture_dir, parameters)
+        except ValueError as e:
+            parser.error(str(e))
+        results = run(fixture, parsed_args.repeat, not parsed_args.no_cli)
+
+    report = {
+        "statmake": statmake.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "parameters": parameters._asdict(),
+        "counts": results.pop("_counts"),
+        "results": results,
+    }
+    report_json = json.dumps(report, indent=2)
+    if parsed_args.output:
+        parsed_args.output.write_text(report_json + "\n", encoding="utf-8")
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
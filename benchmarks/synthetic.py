@@ -0,0 +1,216 @@
+"""Generate synthetic Stylespaces, fvar-only variable fonts and Designspaces of
+arbitrary size for benchmarking.
+
+The fonts only contain `name` and `fvar` tables, which is all statmake needs.
+"""
+
+import random
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+import fontTools.designspaceLib
+import fontTools.misc.plistlib
+import fontTools.ttLib
+import fontTools.ttLib.tables._f_v_a_r
+
+
+class Parameters(NamedTuple):
+    axes: int
+    stops: int
+    locations: int
+    instances: int
+    languages: int = 1
+    # How many of the format 4 locations apply to the font. The STAT table uses
+    # 16-bit offsets for its axis values, so only a limited number fits in a font.
+    applicable_locations: int = 20
+
+
+PRESETS = {
+    "small": Parameters(axes=3, stops=20, locations=50, instances=30),
+    "medium": Parameters(
+        axes=8,
+        stops=100,
+        locations=1000,
+        instances=500,
+        languages=2,
+        applicable_locations=200,
+    ),
+    "large": Parameters(
+        axes=16,
+        stops=500,
+        locations=10000,
+        instances=5000,
+        applicable_locations=250,
+    ),
+}
+
+LANGUAGES = ["en", "de", "fr", "es", "it", "nl", "pt", "sv"]
+
+
+class Fixture(NamedTuple):
+    stylespace_path: Path
+    designspace_path: Path
+    font_path: Path
+
+
+def axis_name(axis_index: int) -> str:
+    return f"Axis {axis_index:02}"
+
+
+def axis_tag(axis_index: int) -> str:
+    return f"A{axis_index:03}"
+
+
+def multilingual(name: str, languages: int) -> Dict[str, str]:
+    names = {language: f"{name} ({language})" for language in LANGUAGES[:languages]}
+    names["en"] = name
+    return names
+
+
+def font_stops(parameters: Parameters) -> int:
+    """Return the number of stops per axis the font's named instances use, always
+    the lowest ones."""
+    return max(2, parameters.stops // 5)
+
+
+def make_stylespace_dict(parameters: Parameters, seed: int = 0) -> Dict[str, Any]:
+    """Return unstructured Stylespace data, as stored in a Stylespace file.
+
+    Every axis has stops at 0, 1, ..., stops - 1, mostly as format 1 locations with
+    some format 2 and 3 ones mixed in. The format 4 locations are distinct random
+    combinations of stops. The first `applicable_locations` of them only use stops
+    that the font's named instances use, the rest uses at least one stop above them
+    so it does not apply to the font.
+
+    Raises ValueError if there are fewer distinct combinations of stops than
+    locations asked for.
+    """
+    applicable = min(parameters.applicable_locations, parameters.locations)
+    applicable_combinations = font_stops(parameters) ** parameters.axes
+    other_combinations = parameters.stops**parameters.axes - applicable_combinations
+    if applicable > applicable_combinations:
+        raise ValueError(
+            f"{applicable} applicable locations were asked for, but the font's "
+            f"stops only make {applicable_combinations} distinct combinations."
+        )
+    if parameters.locations - applicable > other_combinations:
+        raise ValueError(
+            f"{parameters.locations - applicable} locations that do not apply to the "
+            f"font were asked for, but there are only {other_combinations} distinct "
+            "combinations of stops for them."
+        )
+
+    rng = random.Random(seed)
+    axes: List[Dict[str, Any]] = []
+    for axis_index in range(parameters.axes):
+        locations: List[Dict[str, Any]] = []
+        for stop in range(parameters.stops):
+            name = multilingual(f"{axis_name(axis_index)} {stop}", parameters.languages)
+            if stop == 0:
+                locations.append(
+                    {"name": name, "value": stop, "flags": ["ElidableAxisValueName"]}
+                )
+            elif stop % 10 == 5:
+                locations.append({"name": name, "value": stop, "linked_value": 0})
+            elif stop % 10 == 7:
+                locations.append(
+                    {"name": name, "value": stop, "range": [stop - 0.5, stop + 0.5]}
+                )
+            else:
+                locations.append({"name": name, "value": stop})
+        axes.append(
+            {
+                "name": multilingual(axis_name(axis_index), parameters.languages),
+                "tag": axis_tag(axis_index),
+                "locations": locations,
+            }
+        )
+
+    seen = set()
+    named_locations: List[Dict[str, Any]] = []
+    while len(named_locations) < parameters.locations:
+        if len(named_locations) < applicable:
+            location = tuple(rng.randrange(font_stops(parameters)) for _ in axes)
+        else:
+            location = tuple(rng.randrange(parameters.stops) for _ in axes)
+            if max(location) < font_stops(parameters):
+                continue
+        if location in seen:
+            continue
+        seen.add(location)
+        named_locations.append(
+            {
+                "name": multilingual(
+                    "Location " + "-".join(map(str, location)), parameters.languages
+                ),
+                "axis_values": {
+                    axis_name(axis_index): value
+                    for axis_index, value in enumerate(location)
+                },
+            }
+        )
+
+    return {"axes": axes, "locations": named_locations}
+
+
+def make_font(parameters: Parameters, seed: int = 0) -> fontTools.ttLib.TTFont:
+    """Return a font with only a `name` and an `fvar` table, covering all axes of
+    the Stylespace made from the same parameters."""
+    rng = random.Random(seed)
+    font = fontTools.ttLib.TTFont()
+    name_table = font["name"] = fontTools.ttLib.newTable("name")
+    name_table.names = []
+    name_table.setName("Synthetic", 1, 3, 1, 0x409)
+    name_table.setName("Regular", 2, 3, 1, 0x409)
+
+    fvar = font["fvar"] = fontTools.ttLib.newTable("fvar")
+    for axis_index in range(parameters.axes):
+        axis = fontTools.ttLib.tables._f_v_a_r.Axis()
+        axis.axisTag = axis_tag(axis_index)
+        axis.axisNameID = name_table.addName(
+            axis_name(axis_index), platforms=[(3, 1, 0x409)]
+        )
+        axis.minValue = 0.0
+        axis.defaultValue = 0.0
+        axis.maxValue = float(parameters.stops - 1)
+        fvar.axes.append(axis)
+
+    # The name table uses 16-bit offsets for its strings, so large numbers of
+    # instances have to share names.
+    instance_name_ids = [
+        name_table.addName(f"Instance {index}", platforms=[(3, 1, 0x409)])
+        for index in range(min(parameters.instances, 100))
+    ]
+    for instance_index in range(parameters.instances):
+        instance = fontTools.ttLib.tables._f_v_a_r.NamedInstance()
+        instance.subfamilyNameID = instance_name_ids[
+            instance_index % len(instance_name_ids)
+        ]
+        instance.coordinates = {
+            axis.axisTag: float(rng.randrange(font_stops(parameters)))
+            for axis in fvar.axes
+        }
+        fvar.instances.append(instance)
+
+    return font
+
+
+def write_fixture(directory: Path, parameters: Parameters, seed: int = 0) -> Fixture:
+    """Write a Stylespace, a Designspace referencing it and a matching font."""
+    directory.mkdir(parents=True, exist_ok=True)
+    fixture = Fixture(
+        stylespace_path=directory / "Synthetic.stylespace",
+        designspace_path=directory / "Synthetic.designspace",
+        font_path=directory / "Synthetic.ttf",
+    )
+
+    fixture.stylespace_path.write_bytes(
+        fontTools.misc.plistlib.dumps(make_stylespace_dict(parameters, seed))
+    )
+
+    designspace = fontTools.designspaceLib.DesignSpaceDocument()
+    designspace.lib["org.statmake.stylespacePath"] = fixture.stylespace_path.name
+    designspace.write(fixture.designspace_path)
+
+    make_font(parameters, seed).save(fixture.font_path)
+    return fixture
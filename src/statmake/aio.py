@@ -0,0 +1,59 @@
+"""Apply Stylespaces to font files from asyncio code without blocking the event
+loop."""
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+from typing import Mapping, Optional, Union
+
+import statmake.classes
+import statmake.lib
+
+
+async def apply(
+    stylespace: statmake.classes.Stylespace,
+    font_path: Union[str, os.PathLike],
+    output_path: Optional[Union[str, os.PathLike]] = None,
+    additional_locations: Optional[Mapping[str, float]] = None,
+    *,
+    mac_names: bool = False,
+    recompile: bool = False,
+    compact_names: bool = False,
+    result_cache: Optional[statmake.lib.ResultCache] = None,
+    stylespace_index: Optional[statmake.lib.StylespaceIndex] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> bool:
+    """Load the font at font_path, apply the Stylespace and save it to output_path,
+    or in-place, in an executor. Returns whether the font was written.
+
+    executor: The executor to run the work in, the event loop's default executor
+    if None. The work is CPU-bound, so a `concurrent.futures.ProcessPoolExecutor`
+    processes many fonts faster than threads do.
+
+    semaphore: Limits how many fonts are processed at the same time, e.g. to keep
+    memory usage in check when many fonts are submitted at once. It is acquired
+    before the work is handed to the executor.
+
+    To process many fonts, build a `statmake.lib.StylespaceIndex` once and pass it
+    along, then `asyncio.gather` the calls. See
+    `statmake.lib.apply_stylespace_to_font_file` for the other arguments.
+    """
+    call = functools.partial(
+        statmake.lib.apply_stylespace_to_font_file,
+        stylespace,
+        font_path,
+        output_path,
+        additional_locations,
+        mac_names=mac_names,
+        recompile=recompile,
+        stylespace_index=stylespace_index,
+        compact_names=compact_names,
+        result_cache=result_cache,
+    )
+    loop = asyncio.get_running_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, call)
+    async with semaphore:
+        return await loop.run_in_executor(executor, call)
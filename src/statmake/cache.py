@@ -0,0 +1,122 @@
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+import statmake
+
+CACHE_DIR_ENV = "STATMAKE_CACHE_DIR"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class DiskCache:
+    """A directory of cache entries keyed by hex digests.
+
+    Entries are evicted in least-recently-used order once the combined size of all
+    entries with the same suffix exceeds max_size bytes. Recency is tracked through
+    the modification time of the entry files, so several processes can share a
+    cache directory.
+
+    The cache directory must only be writable by trusted users, callers typically
+    store pickled data in it.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        suffix: str,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.max_size = max_size
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the data stored under key, or None if there is none."""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store data under key and evict old entries if the cache grew too big.
+
+        Storing is best-effort: if the cache directory cannot be created or written
+        to, a warning is logged and the data is not stored.
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError as e:
+            logging.warning("Could not write to the cache: %s", e)
+            return
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            logging.warning("Could not write to the cache: %s", e)
+            return
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _evict(self) -> None:
+        try:
+            paths = list(self.directory.glob(f"*{self.suffix}"))
+        except OSError:
+            return
+        entries = []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:  # Removed by another process in the meantime.
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+
+
+def content_key(data: bytes) -> str:
+    """Return a cache key for data that changes with the statmake version."""
+    digest = _versioned_digest()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def file_content_key(fp: BinaryIO) -> str:
+    """Return the `content_key` of the rest of a file, reading it in chunks."""
+    digest = _versioned_digest()
+    for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _versioned_digest() -> "hashlib._Hash":
+    digest = hashlib.sha256()
+    digest.update(statmake.__version__.encode("utf-8"))
+    digest.update(b"\0")
+    return digest
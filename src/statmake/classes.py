@@ -1,19 +1,58 @@
+import contextlib
 import enum
 import functools
+import hashlib
+import json
 import os
+import pickle
+import types
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+from xml.etree import ElementTree
 
 import attrs
 import cattrs
+import cattrs.errors
 import fontTools.designspaceLib
 import fontTools.misc.plistlib
 
-from .errors import StylespaceError
+import statmake.cache
+
+from .errors import Issue, StylespaceError
 
 DESIGNSPACE_STYLESPACE_INLINE_KEY = "org.statmake.stylespace"
 DESIGNSPACE_STYLESPACE_PATH_KEY = "org.statmake.stylespacePath"
 
+# The version of the serialization `Stylespace.fingerprint` digests, bumped when it
+# changes so that fingerprints from before and after never match.
+FINGERPRINT_VERSION = 1
+
+# Plist Stylespace files at least this big are parsed incrementally by default, see
+# `Stylespace.from_file`.
+STREAMING_MIN_SIZE = 4 * 1024 * 1024
+
+
+def _frozen_mapping(mapping: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Return a read-only copy of mapping.
+
+    The copy cannot be pickled, so classes holding one implement `__reduce__`.
+    """
+    return types.MappingProxyType(dict(mapping))
+
 
 class AxisValueFlag(enum.Flag):
     OlderSiblingFontAttribute = 0x0001
@@ -25,7 +64,7 @@ class FlagList:
     """Represent a list of AxisValueFlags so I can implement a value
     property."""
 
-    flags: List[AxisValueFlag] = attrs.field(factory=list)
+    flags: Tuple[AxisValueFlag, ...] = attrs.field(factory=tuple, converter=tuple)
 
     @property
     def value(self) -> int:
@@ -40,7 +79,7 @@ class NameRecord:
     """Represent a IETF BCP 47 language code to name string mapping for the
     `name` table."""
 
-    mapping: Mapping[str, str]
+    mapping: Mapping[str, str] = attrs.field(converter=_frozen_mapping)
 
     def __attrs_post_init__(self) -> None:
         if "en" not in self.mapping:
@@ -49,6 +88,9 @@ class NameRecord:
                 "code 'en') entry."
             )
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), (dict(self.mapping),))
+
     def __getitem__(self, key: str) -> str:
         return self.mapping.__getitem__(key)
 
@@ -81,7 +123,7 @@ class LocationFormat1:
 
     def to_builder_dict(self) -> Dict[str, Any]:
         return {
-            "name": self.name.mapping,
+            "name": dict(self.name.mapping),
             "value": self.value,
             "flags": self.flags.value,
         }
@@ -91,12 +133,12 @@ class LocationFormat1:
 class LocationFormat2:
     name: NameRecord
     value: float
-    range: Tuple[float, float]
+    range: Tuple[float, float] = attrs.field(converter=tuple)
     flags: FlagList = attrs.field(factory=FlagList)
 
     def to_builder_dict(self) -> Dict[str, Any]:
         return {
-            "name": self.name.mapping,
+            "name": dict(self.name.mapping),
             "nominalValue": self.value,
             "rangeMinValue": self.range[0],
             "rangeMaxValue": self.range[1],
@@ -113,7 +155,7 @@ class LocationFormat3:
 
     def to_builder_dict(self) -> Dict[str, Any]:
         return {
-            "name": self.name.mapping,
+            "name": dict(self.name.mapping),
             "value": self.value,
             "linkedValue": self.linked_value,
             "flags": self.flags.value,
@@ -123,165 +165,284 @@ class LocationFormat3:
 @attrs.frozen
 class LocationFormat4:
     name: NameRecord
-    axis_values: Mapping[str, float]
+    axis_values: Mapping[str, float] = attrs.field(converter=_frozen_mapping)
     flags: FlagList = attrs.field(factory=FlagList)
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), (self.name, dict(self.axis_values), self.flags))
+
     def to_builder_dict(self, name_to_tag: Mapping[str, str]) -> Dict[str, Any]:
         return {
-            "name": self.name.mapping,
+            "name": dict(self.name.mapping),
             "location": {name_to_tag[k]: v for k, v in self.axis_values.items()},
             "flags": self.flags.value,
         }
 
 
+AxisLocation = Union[LocationFormat1, LocationFormat2, LocationFormat3]
+
+
 @attrs.frozen
 class Axis:
     name: NameRecord
     tag: str
-    locations: List[Union[LocationFormat1, LocationFormat2, LocationFormat3]] = (
-        attrs.field(factory=list)
-    )
+    locations: Tuple[AxisLocation, ...] = attrs.field(factory=tuple, converter=tuple)
     ordering: Optional[int] = None
 
 
 ElidedFallback = Union[NameRecord, int]
 
 
-@attrs.frozen
+@attrs.frozen(init=False)
 class Stylespace:
-    axes: List[Axis]
-    locations: List[LocationFormat4] = attrs.field(factory=list)
-    elided_fallback_name_id: ElidedFallback = 2
+    """A Stylespace.
 
-    def __attrs_post_init__(self) -> None:
-        """Fill in a default ordering unless the user specified at least one
-        custom one, also do sanity checking.
+    Stylespaces and everything in them are deeply immutable: sequences are stored as
+    tuples and mappings as read-only copies. One Stylespace can therefore be shared
+    between threads and applied to many fonts at the same time.
+    """
+
+    axes: Tuple[Axis, ...]
+    locations: Tuple[LocationFormat4, ...] = attrs.field(factory=tuple)
+    elided_fallback_name_id: ElidedFallback = 2
 
-        This works around the frozen state with `object.__setattr__`.
+    def __init__(
+        self,
+        axes: Sequence[Axis],
+        locations: Optional[Sequence[LocationFormat4]] = None,
+        elided_fallback_name_id: ElidedFallback = 2,
+        *,
+        validate: bool = True,
+    ) -> None:
+        """Construct a Stylespace and sanity check it.
+
+        The axes get a default ordering unless at least one of them specifies a
+        custom one. The Axis objects passed in are left untouched.
+
+        validate: Pass False to skip the sanity checks for data that is known to be
+        valid, e.g. because it was produced from a Stylespace that was validated
+        before.
+        """
+        if all(axis.ordering is None for axis in axes):
+            axes = [
+                attrs.evolve(axis, ordering=index) for index, axis in enumerate(axes)
+            ]
+        self.__attrs_init__(
+            tuple(axes), tuple(locations or ()), elided_fallback_name_id
+        )
+        if validate:
+            self._validate()
+
+    def _validate(self) -> None:
+        """Sanity check the data and raise a StylespaceError listing all problems,
+        see `Stylespace.find_issues`."""
+        issues = self.find_issues()
+        if issues:
+            raise StylespaceError.from_issues(issues)
+
+    def find_issues(self) -> List[Issue]:
+        """Sanity check the data and return all problems found.
+
+        All checks are done in a single pass over the axes and then the named
+        locations, building the lookups they share (reference languages, values per
+        axis, format 4 coordinates) only once.
         """
-        if all(axis.ordering is None for axis in self.axes):
-            for index, axis in enumerate(self.axes):
-                object.__setattr__(axis, "ordering", index)
-        elif not all(
+        issues: List[Issue] = []
+        if not all(
             isinstance(axis.ordering, int) and axis.ordering >= 0 for axis in self.axes
         ):
-            raise StylespaceError(
-                "If you specify the ordering for one axis, you must specify all of "
-                "them and they must be >= 0."
-            )
-
-        # Ensure named locations only contain axis names that are present in the
-        # Stylespace and specify a location for all axes.
-        available_axes = {a.name.default for a in self.axes}
-        for named_location in self.locations:
-            named_location_axes = set(named_location.axis_values.keys())
-            if named_location_axes != available_axes:
-                raise StylespaceError(
-                    f"Location named '{named_location.name.default}' must specify "
-                    "values for all axes in the Stylespace and contain no other axis "
-                    "names."
+            issues.append(
+                Issue(
+                    "invalid_ordering",
+                    "If you specify the ordering for one axis, you must specify all "
+                    "of them and they must be >= 0.",
                 )
+            )
 
-        # Ensure that all name records have the same languages specified.
-        reference_languages = None
-        for axis in self.axes:
-            if reference_languages is None:
-                reference_languages = sorted(axis.name.mapping.keys())
-            for location in axis.locations:
-                location_languages = sorted(location.name.mapping.keys())
-                if location_languages != reference_languages:
-                    raise StylespaceError(
-                        "All names must be supplied in the same languages. On axis "
-                        f"'{axis.name.default}', location '{location.name.default}' is "
-                        f"named in languages {location_languages} but "
-                        f"expected was {reference_languages}."
-                    )
-        for named_location in self.locations:
-            assert reference_languages is not None
-            location_languages = sorted(named_location.name.mapping.keys())
-            if location_languages != reference_languages:
-                raise StylespaceError(
-                    "All names must be supplied in the same languages. The named "
-                    f"location '{named_location.name.default}' is "
-                    f"named in languages {location_languages} but "
-                    f"expected was {reference_languages}."
-                )
+        # All name records must have the same languages specified as the first axis
+        # name.
+        reference_languages = (
+            set(self.axes[0].name.mapping.keys()) if self.axes else set()
+        )
 
-        # Ensure linked_values are present on the same axis in the Stylespace
         for axis in self.axes:
-            values = {location.value for location in axis.locations}
+            # Ensure location values are unique and linked_values are present on the
+            # same axis (ranges are ignored).
+            axis_name = axis.name.default
+            values: Set[float] = set()
+            linked_locations: List[LocationFormat3] = []
             for location in axis.locations:
-                linked_value: Optional[float] = getattr(location, "linked_value", None)
-                if linked_value is not None and linked_value not in values:
-                    raise StylespaceError(
-                        f"On axis '{axis.name.default}', location "
-                        f"'{location.name.default}' specifies a linked_value of "
-                        f"'{linked_value}', which does not exist on that axis "
-                        "(ranges are ignored)."
+                location_name = location.name.default
+                if location.name.mapping.keys() != reference_languages:
+                    issues.append(
+                        Issue(
+                            "language_mismatch",
+                            "All names must be supplied in the same languages. On "
+                            f"axis '{axis_name}', location '{location_name}' is named "
+                            f"in languages {sorted(location.name.mapping.keys())} but "
+                            f"expected was {sorted(reference_languages)}.",
+                            axis_name,
+                            location.value,
+                            location_name,
+                        )
                     )
-
-        # Ensure location values are unique.
-        for axis in self.axes:
-            values = set()
-            for location in axis.locations:
                 if location.value in values:
-                    raise StylespaceError(
-                        f"On axis '{axis.name.default}', location "
-                        f"'{location.name.default}' specifies a duplicate location "
-                        f"value of '{location.value}', which is already assigned on "
-                        "the same axis."
+                    issues.append(
+                        Issue(
+                            "duplicate_value",
+                            f"On axis '{axis_name}', location '{location_name}' "
+                            "specifies a duplicate location value of "
+                            f"'{location.value}', which is already assigned on the "
+                            "same axis.",
+                            axis_name,
+                            location.value,
+                            location_name,
+                        )
                     )
                 values.add(location.value)
+                if isinstance(location, LocationFormat3):
+                    linked_locations.append(location)
+            for location in linked_locations:
+                if location.linked_value not in values:
+                    issues.append(
+                        Issue(
+                            "missing_linked_value",
+                            f"On axis '{axis_name}', location "
+                            f"'{location.name.default}' specifies a linked_value of "
+                            f"'{location.linked_value}', which does not exist on that "
+                            "axis (ranges are ignored).",
+                            axis_name,
+                            location.linked_value,
+                            location.name.default,
+                        )
+                    )
+
+        # Ensure named locations only contain axis names that are present in the
+        # Stylespace, specify a location for all axes and are unique.
+        available_axes = {a.name.default for a in self.axes}
         named_values: Set[Tuple[Tuple[str, float], ...]] = set()
         for named_location in self.locations:
+            location_name = named_location.name.default
+            if named_location.axis_values.keys() != available_axes:
+                issues.append(
+                    Issue(
+                        "incomplete_named_location",
+                        f"Location named '{location_name}' must specify values for "
+                        "all axes in the Stylespace and contain no other axis names.",
+                        location=location_name,
+                    )
+                )
+            if named_location.name.mapping.keys() != reference_languages:
+                issues.append(
+                    Issue(
+                        "language_mismatch",
+                        "All names must be supplied in the same languages. The named "
+                        f"location '{location_name}' is named in languages "
+                        f"{sorted(named_location.name.mapping.keys())} but expected "
+                        f"was {sorted(reference_languages)}.",
+                        location=location_name,
+                    )
+                )
             named_location_tuple = tuple(named_location.axis_values.items())
             if named_location_tuple in named_values:
-                raise StylespaceError(
-                    f"The named location '{named_location.name.default}' specifies a "
-                    "duplicate location already taken by another."
+                issues.append(
+                    Issue(
+                        "duplicate_named_location",
+                        f"The named location '{location_name}' specifies a duplicate "
+                        "location already taken by another.",
+                        location=location_name,
+                    )
                 )
             named_values.add(named_location_tuple)
+        return issues
 
     @classmethod
     def from_dict(
-        cls, dict_data: dict, detailed_validation: bool = False
+        cls, dict_data: dict, detailed_validation: bool = False, validate: bool = True
     ) -> "Stylespace":
-        """Construct Stylespace from unstructured dict data."""
-        converter = cattrs.Converter(detailed_validation=detailed_validation)
-        converter.register_structure_hook(
-            FlagList,
-            lambda list_of_str_flags, cls: cls(  # type: ignore
-                [getattr(AxisValueFlag, f) for f in list_of_str_flags]
-            ),
-        )
-        converter.register_structure_hook(
-            NameRecord,
-            lambda data, cls: cls.structure(data),  # type: ignore
-        )
-        converter.register_structure_hook(
-            ElidedFallback,
-            lambda data, _cls: data
-            if isinstance(data, int)
-            else NameRecord.structure(data),  # type: ignore
-        )
-        return converter.structure(dict_data, cls)
+        """Construct Stylespace from unstructured dict data.
+
+        validate: Pass False to skip the sanity checks, see `Stylespace.__init__`.
+        """
+        converter = _DETAILED_CONVERTER if detailed_validation else _CONVERTER
+        with _structure_errors():
+            if validate:
+                return converter.structure(dict_data, cls)
+            fields = {
+                field.name: converter.structure(dict_data[field.name], field.type)
+                for field in attrs.fields(cls)
+                if field.name in dict_data
+            }
+            return cls(**fields, validate=False)
 
     def to_dict(self) -> Dict[str, Any]:
         """Construct dict from structured Stylespace data."""
-        converter = cattrs.Converter()
-        converter.register_unstructure_hook(  # type: ignore
-            FlagList,
-            lambda cls: [flag.name for flag in cls.flags],  # type: ignore
+        return _CONVERTER.unstructure(self)
+
+    def to_bytes(self, as_json: bool = False) -> bytes:
+        """Serialize the Stylespace to (XML) plist data, or JSON data if as_json is
+        True, that `Stylespace.from_bytes` reads back.
+
+        The output is canonical: keys are sorted, whole numbers are written as
+        integers and the output does not depend on how the Stylespace was
+        constructed, so equal Stylespaces serialize to identical bytes.
+        """
+        data = _canonicalize(self.to_dict())
+        if as_json:
+            return (
+                json.dumps(data, sort_keys=True, indent=2, ensure_ascii=False) + "\n"
+            ).encode("utf-8")
+        return fontTools.misc.plistlib.dumps(data, sort_keys=True)
+
+    def to_file(
+        self, stylespace_path: Union[str, os.PathLike], as_json: Optional[bool] = None
+    ) -> None:
+        """Write the Stylespace to a file, see `Stylespace.to_bytes`.
+
+        as_json: Whether to write JSON instead of a plist. If None, JSON is written
+        to paths ending in `.json`.
+        """
+        if as_json is None:
+            as_json = os.fspath(stylespace_path).lower().endswith(".json")
+        with open(stylespace_path, "wb") as fp:
+            fp.write(self.to_bytes(as_json))
+
+    def fingerprint(self) -> str:
+        """Return a hex digest of the Stylespace content.
+
+        Equal Stylespaces have the same fingerprint, across processes, Python and
+        statmake versions, so it can be used to key build caches. The digest only
+        changes when the Stylespace does, or when the serialization it is based on
+        changes in a way that is reflected by `FINGERPRINT_VERSION`.
+        """
+        data = json.dumps(
+            _canonicalize(self.to_dict()),
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=True,
+            allow_nan=False,
         )
-        converter.register_unstructure_hook(NameRecord, lambda cls: cls.mapping)  # type: ignore
-        return converter.unstructure(self)
+        digest = hashlib.sha256(f"statmake-stylespace-{FINGERPRINT_VERSION}\0".encode())
+        digest.update(data.encode("ascii"))
+        return digest.hexdigest()
 
     @classmethod
     def from_bytes(
         cls, stylespace_content: bytes, detailed_validation: bool = False
     ) -> "Stylespace":
-        """Construct Stylespace from bytes containing (XML) plist data."""
-        stylespace_content_parsed = fontTools.misc.plistlib.loads(stylespace_content)
+        """Construct Stylespace from bytes containing JSON or (XML) plist data.
+
+        The format is detected from the content: JSON Stylespaces are objects, so
+        they start with `{`. JSON is much faster to parse than XML, which matters
+        for large multilingual Stylespaces. Both map onto the schema of
+        `Stylespace.from_dict`.
+        """
+        if _is_json(stylespace_content):
+            stylespace_content_parsed = json.loads(stylespace_content)
+        else:
+            stylespace_content_parsed = fontTools.misc.plistlib.loads(
+                stylespace_content
+            )
         return cls.from_dict(stylespace_content_parsed, detailed_validation)
 
     @classmethod
@@ -289,14 +450,78 @@ class Stylespace:
         cls,
         stylespace_path: Union[str, bytes, os.PathLike],
         detailed_validation: bool = False,
+        cache_dir: Optional[Union[str, os.PathLike]] = None,
+        streaming: Optional[bool] = None,
     ) -> "Stylespace":
-        """Construct Stylespace from path to (XML) plist file."""
+        """Construct Stylespace from path to a JSON or (XML) plist file, see
+        `Stylespace.from_bytes`.
+
+        cache_dir: a directory to store the parsed and validated Stylespace in,
+        keyed by a hash of the file content and the statmake version. When the
+        same content is loaded again, both parsing and validation are skipped.
+
+        streaming: Whether to parse plist files incrementally, building the axes and
+        locations as they are read instead of reading the whole file and building
+        the full plist object tree first. This keeps the peak memory usage close to
+        the size of the resulting Stylespace for generated files with tens of
+        thousands of locations. If None, files of at least `STREAMING_MIN_SIZE`
+        bytes are streamed. JSON files are always read in one go.
+        """
         with open(stylespace_path, "rb") as fp:
-            return cls.from_bytes(fp.read(), detailed_validation)
+            if streaming is None:
+                streaming = os.fstat(fp.fileno()).st_size >= STREAMING_MIN_SIZE
+            streaming = streaming and not _is_json(fp.peek())
+            if cache_dir is None:
+                if streaming:
+                    return _iterparse_stylespace(cls, fp, detailed_validation)
+                return cls.from_bytes(fp.read(), detailed_validation)
+
+            cache = statmake.cache.DiskCache(cache_dir, ".stylespace.pickle")
+            if streaming:
+                key = statmake.cache.file_content_key(fp)
+                fp.seek(0)
+            else:
+                stylespace_content = fp.read()
+                key = statmake.cache.content_key(stylespace_content)
+            stylespace = cls._from_cache(cache, key)
+            if stylespace is not None:
+                return stylespace
+
+            if streaming:
+                stylespace = _iterparse_stylespace(cls, fp, detailed_validation)
+            else:
+                stylespace = cls.from_bytes(stylespace_content, detailed_validation)
+        cache.put(key, pickle.dumps(stylespace, protocol=pickle.HIGHEST_PROTOCOL))
+        return stylespace
+
+    @classmethod
+    def _from_cache(
+        cls, cache: statmake.cache.DiskCache, key: str
+    ) -> Optional["Stylespace"]:
+        """Return the Stylespace stored under key, or None if there is no usable
+        entry."""
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                stylespace = pickle.loads(cached)
+            except (
+                pickle.UnpicklingError,
+                AttributeError,
+                EOFError,
+                ImportError,
+                TypeError,
+                ValueError,
+            ):
+                stylespace = None  # A corrupt or incompatible entry, rebuild it.
+            if isinstance(stylespace, cls):
+                return stylespace
+        return None
 
     @classmethod
     def from_designspace(
-        cls, designspace: fontTools.designspaceLib.DesignSpaceDocument
+        cls,
+        designspace: fontTools.designspaceLib.DesignSpaceDocument,
+        cache_dir: Optional[Union[str, os.PathLike]] = None,
     ) -> "Stylespace":
         f"""Construct Stylespace from unstructured dict data or a path stored in a
         Designspace object's lib.
@@ -304,10 +529,12 @@ class Stylespace:
         The keys:
 
         - `{DESIGNSPACE_STYLESPACE_INLINE_KEY}`: The content of a regular Stylespace
-          file as a dict.
+          file as a dict, or as a string containing JSON or (XML) plist data.
         - `{DESIGNSPACE_STYLESPACE_PATH_KEY}`: A path to an external Stylespace file,
           relative to the Designspace file (the Designspace object must have the `path`
           attribute set).
+
+        cache_dir is passed on to `Stylespace.from_file` for external files.
         """
         stylespace_inline = designspace.lib.get(DESIGNSPACE_STYLESPACE_INLINE_KEY)
         stylespace_path = designspace.lib.get(DESIGNSPACE_STYLESPACE_PATH_KEY)
@@ -320,6 +547,13 @@ class Stylespace:
                 "to an external Stylespace file."
             )
 
+        if isinstance(stylespace_inline, str):
+            try:
+                return cls.from_bytes(stylespace_inline.encode("utf-8"))
+            except (ValueError, SyntaxError) as e:
+                raise StylespaceError(
+                    f"Could not parse the inline Stylespace data: {e}"
+                ) from e
         if stylespace_inline:
             return cls.from_dict(stylespace_inline)
 
@@ -329,4 +563,185 @@ class Stylespace:
                 "Stylespace path is relative to the Designspace file."
             )
         stylespace_path_lookup = Path(designspace.path).parent / stylespace_path
-        return cls.from_file(stylespace_path_lookup)
+        return cls.from_file(stylespace_path_lookup, cache_dir=cache_dir)
+
+
+@contextlib.contextmanager
+def _structure_errors() -> Iterator[None]:
+    """Turn the exceptions raised while structuring malformed Stylespace data into
+    a StylespaceError with an issue for each problem."""
+    try:
+        yield
+    except (KeyError, TypeError, ValueError, cattrs.errors.BaseValidationError) as e:
+        issues: List[Issue] = []
+        _collect_structure_issues(e, issues)
+        raise StylespaceError.from_issues(issues) from e
+
+
+def _collect_structure_issues(exception: BaseException, issues: List[Issue]) -> None:
+    # Detailed validation groups the exceptions, possibly nested.
+    if isinstance(exception, cattrs.errors.BaseValidationError):
+        for sub_exception in exception.exceptions:
+            _collect_structure_issues(sub_exception, issues)
+    elif isinstance(exception, StylespaceError) and exception.issues:
+        issues.extend(exception.issues)
+    elif isinstance(exception, KeyError):
+        issues.append(
+            Issue("invalid_data", f"Invalid Stylespace data: missing key {exception}")
+        )
+    else:
+        issues.append(Issue("invalid_data", f"Invalid Stylespace data: {exception}"))
+
+
+def _canonicalize(data: Any) -> Any:
+    """Return unstructured Stylespace data with sorted dicts, lists for tuples,
+    integral floats as ints and None values dropped."""
+    if isinstance(data, Mapping):
+        return {
+            key: _canonicalize(value)
+            for key, value in sorted(data.items())
+            if value is not None
+        }
+    if isinstance(data, (list, tuple)):
+        return [_canonicalize(value) for value in data]
+    if isinstance(data, float) and data.is_integer():
+        return int(data)
+    return data
+
+
+def _is_json(content: bytes) -> bool:
+    """Return whether the Stylespace content is JSON rather than a plist, which
+    starts with an XML declaration or `<plist>`."""
+    return content.lstrip(b"\xef\xbb\xbf \t\r\n")[:1] == b"{"
+
+
+_PLIST_SCALARS: Dict[str, Callable[[str], Any]] = {
+    "string": str,
+    "integer": int,
+    "real": float,
+}
+
+
+def _iterparse_stylespace(
+    cls: Type["Stylespace"], fp: BinaryIO, detailed_validation: bool
+) -> "Stylespace":
+    """Construct Stylespace from a plist file, building each axis and location as
+    soon as its element is closed.
+
+    Only the dicts and arrays enclosing the element currently being read are kept
+    as plist objects, XML elements are dropped once consumed. The data is
+    structured piecewise with the same converter as `Stylespace.from_dict`.
+    """
+    converter = _DETAILED_CONVERTER if detailed_validation else _CONVERTER
+    # The open dicts and arrays, each with the key it is stored under in its
+    # parent (None for array items), and the pending key of each open dict.
+    containers: List[Tuple[Any, Optional[str]]] = []
+    keys: List[Optional[str]] = []
+    elements: List[ElementTree.Element] = []
+    root: Any = None
+
+    with _structure_errors():
+        for event, element in ElementTree.iterparse(fp, events=("start", "end")):
+            if event == "start":
+                elements.append(element)
+                if element.tag in ("dict", "array"):
+                    parent_key = keys[-1] if keys else None
+                    containers.append(({} if element.tag == "dict" else [], parent_key))
+                    keys.append(None)
+                continue
+
+            elements.pop()
+            tag = element.tag
+            if tag == "key":
+                keys[-1] = element.text or ""
+            elif tag in ("dict", "array"):
+                value, _ = containers.pop()
+                keys.pop()
+                value = _structure_stylespace_part(converter, containers, value)
+            elif tag in _PLIST_SCALARS:
+                value = _PLIST_SCALARS[tag](element.text or "")
+            elif tag in ("true", "false"):
+                value = tag == "true"
+            elif tag == "plist":
+                pass
+            else:
+                raise StylespaceError(f"Unsupported plist element <{tag}>.")
+
+            if tag not in ("key", "plist"):
+                if not containers:
+                    root = value
+                elif isinstance(containers[-1][0], dict):
+                    containers[-1][0][keys[-1]] = value
+                    keys[-1] = None
+                else:
+                    containers[-1][0].append(value)
+            if elements:
+                elements[-1].clear()
+
+        if not isinstance(root, dict):
+            raise StylespaceError("A Stylespace plist must contain a dict.")
+        if "axes" not in root:
+            raise StylespaceError("A Stylespace must contain 'axes'.")
+        fields: Dict[str, Any] = {}
+        if "elided_fallback_name_id" in root:
+            fields["elided_fallback_name_id"] = converter.structure(
+                root["elided_fallback_name_id"],
+                ElidedFallback,  # type: ignore
+            )
+        return cls(root["axes"], root.get("locations"), **fields)
+
+
+def _structure_stylespace_part(
+    converter: cattrs.Converter,
+    containers: List[Tuple[Any, Optional[str]]],
+    value: Any,
+) -> Any:
+    """Structure a just closed plist dict or array if it is an axis or a location,
+    judging by its place in the enclosing containers, or return it as is."""
+    path = [key for _, key in containers]
+    if path == [None, "axes"] and isinstance(value, dict):
+        locations = value.pop("locations", [])
+        axis = converter.structure(value, Axis)
+        return attrs.evolve(axis, locations=locations)
+    if path == [None, "axes", None, "locations"]:
+        return converter.structure(value, AxisLocation)  # type: ignore
+    if path == [None, "locations"]:
+        return converter.structure(value, LocationFormat4)
+    return value
+
+
+def _make_converter(detailed_validation: bool) -> cattrs.Converter:
+    """Build a converter with the hooks for (un)structuring Stylespaces.
+
+    Building the converter and having cattrs generate the (un)structuring code is
+    expensive, so it is done once per validation mode at import time, see
+    `_CONVERTER` and `_DETAILED_CONVERTER`. The generated code is cached by the
+    converter on first use.
+    """
+    converter = cattrs.Converter(detailed_validation=detailed_validation)
+    converter.register_structure_hook(
+        FlagList,
+        lambda list_of_str_flags, cls: cls(  # type: ignore
+            [getattr(AxisValueFlag, f) for f in list_of_str_flags]
+        ),
+    )
+    converter.register_structure_hook(
+        NameRecord,
+        lambda data, cls: cls.structure(data),  # type: ignore
+    )
+    converter.register_structure_hook(
+        ElidedFallback,
+        lambda data, _cls: (
+            data if isinstance(data, int) else NameRecord.structure(data)
+        ),  # type: ignore
+    )
+    converter.register_unstructure_hook(  # type: ignore
+        FlagList,
+        lambda cls: [flag.name for flag in cls.flags],  # type: ignore
+    )
+    converter.register_unstructure_hook(NameRecord, lambda cls: dict(cls.mapping))  # type: ignore
+    return converter
+
+
+_CONVERTER = _make_converter(detailed_validation=False)
+_DETAILED_CONVERTER = _make_converter(detailed_validation=True)
@@ -1,26 +1,48 @@
 import argparse
+import functools
+import json
 import logging
+import os
 import sys
 from pathlib import Path
-from typing import List, Optional
-
-import fontTools.designspaceLib
-import fontTools.ttLib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 import statmake
-import statmake.classes
-import statmake.lib
+import statmake.cache
 from statmake.errors import Error, StylespaceError
 
+# fontTools, cattrs and the rest of statmake are imported where they are needed,
+# so that `statmake --version` and argument errors return quickly. See
+# tests/test_startup.py.
+if TYPE_CHECKING:
+    from statmake.classes import Stylespace
+    from statmake.lib import ResultCache, StylespaceIndex
+
 
 def main(args: Optional[List[str]] = None) -> None:
+    if args is None:
+        args = sys.argv[1:]
+    if args[:1] == ["serve"]:
+        _serve(args[1:])
+        return
+
     logging.basicConfig(format="%(levelname)s: %(message)s")
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--version", action="version", version=statmake.__version__)
     parser.add_argument(
         "--stylespace",
-        type=statmake.classes.Stylespace.from_file,
+        type=Path,
         help=(
             "The path to the Stylespace file, if it is not contained in the "
             "Designspace."
@@ -30,13 +52,21 @@ def main(args: Optional[List[str]] = None) -> None:
         "--designspace",
         "-m",
         required=True,
-        type=fontTools.designspaceLib.DesignSpaceDocument.fromfile,
+        type=Path,
         help="The path to the Designspace file used to generate the variable font.",
     )
     parser.add_argument(
         "--output-path",
         type=Path,
-        help="Write the modified font to this path instead of in-place.",
+        help=(
+            "Write the modified font to this path instead of in-place, or to "
+            "standard output if it is '-'. Only valid with a single variable font."
+        ),
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        help="Write the modified fonts into this directory instead of in-place.",
     )
     parser.add_argument(
         "--mac-names",
@@ -44,28 +74,412 @@ def main(args: Optional[List[str]] = None) -> None:
         help="Generate legacy Mac name entries for each default Windows name entry.",
     )
     parser.add_argument(
-        "variable_font", type=Path, help="The path to the variable font file."
+        "--cache-dir",
+        type=Path,
+        default=os.environ.get(statmake.cache.CACHE_DIR_ENV),
+        help=(
+            "Cache parsed and validated Stylespaces and the generated tables in "
+            "this directory, so that loading the Stylespace and applying it to fonts "
+            "whose fvar and name tables did not change is faster. Can also be set "
+            "with the "
+            f"{statmake.cache.CACHE_DIR_ENV} environment variable."
+        ),
+    )
+    parser.add_argument(
+        "--recompile",
+        action="store_true",
+        help=(
+            "Decompile and recompile every table of the font when saving it. By "
+            "default, only the fvar, name and STAT tables are touched and all other "
+            "tables are copied through unchanged."
+        ),
+    )
+    parser.add_argument(
+        "--compact-names",
+        action="store_true",
+        help=(
+            "Merge name records with identical strings and drop the ones no table "
+            "uses anymore, e.g. names left behind by an earlier run. The bytes "
+            "saved are reported in the --profile output."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="The number of fonts to process in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="DIR",
+        help=(
+            "Write the duration of each processing phase for each font into this "
+            "directory, as <font file name>.json."
+        ),
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=("json", "cprofile"),
+        default="json",
+        help=(
+            "With cprofile, write a cProfile dump of the work on each font as "
+            "<font file name>.prof instead, for use with e.g. pstats or snakeviz."
+        ),
+    )
+    parser.add_argument(
+        "--variable-fonts-dir",
+        type=Path,
+        help=(
+            "Apply the Stylespace to every variable font the Designspace declares, "
+            "taking the built fonts from this directory. The locations on the axes "
+            "a font does not contain are derived from its axis subsets."
+        ),
+    )
+    parser.add_argument(
+        "variable_fonts",
+        metavar="variable_font",
+        nargs="*",
+        type=Path,
+        help=(
+            "The path to the variable font file(s). Use '-' to read a single font "
+            "from standard input and write it to standard output, unless "
+            "--output-path is given."
+        ),
     )
     parsed_args = parser.parse_args(args)
-    designspace = parsed_args.designspace
+    if parsed_args.variable_fonts_dir:
+        if parsed_args.variable_fonts:
+            parser.error(
+                "Pass either variable fonts or --variable-fonts-dir, not both."
+            )
+        if parsed_args.output_path:
+            parser.error(
+                "--output-path cannot be used with --variable-fonts-dir, use "
+                "--output-dir instead."
+            )
+    elif not parsed_args.variable_fonts:
+        parser.error("Pass at least one variable font or --variable-fonts-dir.")
+    if parsed_args.output_path and len(parsed_args.variable_fonts) > 1:
+        parser.error(
+            "--output-path can only be used with a single variable font, use "
+            "--output-dir instead."
+        )
+    if parsed_args.output_path and parsed_args.output_dir:
+        parser.error("--output-path and --output-dir are mutually exclusive.")
+    if _STDIO in parsed_args.variable_fonts:
+        if len(parsed_args.variable_fonts) > 1:
+            parser.error("'-' can only be used as the only variable font.")
+        if parsed_args.output_dir:
+            parser.error("'-' cannot be used with --output-dir.")
+    if parsed_args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    _run(parsed_args)
+
+
+def _run(parsed_args: argparse.Namespace) -> None:
+    import fontTools.designspaceLib
+    import fontTools.ttLib
+
+    import statmake.classes
+    import statmake.lib
+
+    profile = None
+    setup_recorder = None
+    if parsed_args.profile:
+        parsed_args.profile.mkdir(parents=True, exist_ok=True)
+        setup_recorder = statmake.lib.PhaseRecorder()
+        profile = _Profile(
+            parsed_args.profile, parsed_args.profile_format, setup_recorder.phases
+        )
+
+    try:
+        with statmake.lib.instrument_phase(setup_recorder, "load_designspace"):
+            designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+                parsed_args.designspace
+            )
+    # Malformed XML raises an xml.etree.ElementTree.ParseError, a SyntaxError.
+    except (
+        OSError,
+        SyntaxError,
+        fontTools.designspaceLib.DesignSpaceDocumentError,
+    ) as e:
+        logging.error("Could not load Designspace file: %s", str(e))
+        sys.exit(1)
 
     if parsed_args.stylespace:
-        stylespace = parsed_args.stylespace
+        try:
+            with statmake.lib.instrument_phase(setup_recorder, "load_stylespace"):
+                stylespace = statmake.classes.Stylespace.from_file(
+                    parsed_args.stylespace, cache_dir=parsed_args.cache_dir
+                )
+        except (StylespaceError, OSError, SyntaxError, ValueError) as e:
+            for message in _error_messages(e):
+                logging.error("Could not load Stylespace file: %s", message)
+            sys.exit(1)
     else:
         try:
-            stylespace = statmake.classes.Stylespace.from_designspace(designspace)
-        except StylespaceError as e:
-            logging.error("Could not load Stylespace data from Designspace: %s", str(e))
+            with statmake.lib.instrument_phase(setup_recorder, "load_stylespace"):
+                stylespace = statmake.classes.Stylespace.from_designspace(
+                    designspace, cache_dir=parsed_args.cache_dir
+                )
+        # The referenced Stylespace file may be missing or malformed.
+        except (StylespaceError, OSError, SyntaxError, ValueError) as e:
+            for message in _error_messages(e):
+                logging.error(
+                    "Could not load Stylespace data from Designspace: %s", message
+                )
             sys.exit(1)
-    additional_locations = designspace.lib.get("org.statmake.additionalLocations", {})
+    with statmake.lib.instrument_phase(setup_recorder, "build_stylespace_index"):
+        stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(stylespace)
+    result_cache = None
+    if parsed_args.cache_dir:
+        result_cache = statmake.lib.ResultCache(parsed_args.cache_dir)
+        with statmake.lib.instrument_phase(setup_recorder, "fingerprint_stylespace"):
+            result_cache.fingerprint(stylespace)
+    apply = functools.partial(
+        _apply_to_font_file,
+        stylespace_index,
+        mac_names=parsed_args.mac_names,
+        recompile=parsed_args.recompile,
+        compact_names=parsed_args.compact_names,
+        result_cache=result_cache,
+        profile=profile,
+    )
 
-    font = fontTools.ttLib.TTFont(parsed_args.variable_font)
-    try:
-        statmake.lib.apply_stylespace_to_variable_font(
-            stylespace, font, additional_locations, mac_names=parsed_args.mac_names
+    font_jobs: List[Tuple[Path, Path, Mapping[str, float]]] = []
+    if parsed_args.variable_fonts_dir:
+        for variable_font in statmake.lib.variable_fonts_from_designspace(designspace):
+            font_path = parsed_args.variable_fonts_dir / variable_font.filename
+            if parsed_args.output_dir:
+                output_path = parsed_args.output_dir / variable_font.filename
+            else:
+                output_path = font_path
+            font_jobs.append(
+                (font_path, output_path, variable_font.additional_locations)
+            )
+    else:
+        additional_locations = designspace.lib.get(
+            "org.statmake.additionalLocations", {}
         )
-    except Error as e:
-        logging.error("Cannot apply Stylespace to font: %s", str(e))
+        for font_path in parsed_args.variable_fonts:
+            if parsed_args.output_path:
+                output_path = parsed_args.output_path
+            elif font_path == _STDIO:
+                output_path = _STDIO
+            elif parsed_args.output_dir:
+                output_path = parsed_args.output_dir / font_path.name
+            else:
+                output_path = font_path
+            font_jobs.append((font_path, output_path, additional_locations))
+
+    if parsed_args.output_dir:
+        try:
+            parsed_args.output_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logging.error("Could not create the output directory: %s", str(e))
+            sys.exit(1)
+
+    failures: List[Tuple[Path, List[str]]] = []
+    if parsed_args.jobs == 1 or len(font_jobs) == 1:
+        for font_path, output_path, additional_locations in font_jobs:
+            try:
+                apply(font_path, output_path, additional_locations)
+            except (Error, OSError, fontTools.ttLib.TTLibError) as e:
+                failures.append((font_path, _error_messages(e)))
+            except Exception as e:
+                # E.g. a truncated font. Keep processing the other fonts.
+                logging.debug("Unexpected error for '%s'", font_path, exc_info=True)
+                failures.append((font_path, [f"{type(e).__name__}: {e}"]))
+    else:
+        # The Stylespace, its index and the result cache are pickled and sent to
+        # each worker once, so they are only parsed, validated and computed once
+        # and each worker fingerprints the Stylespace once.
+        import concurrent.futures
+
+        with concurrent.futures.ProcessPoolExecutor(
+            parsed_args.jobs, initializer=_init_worker, initargs=(apply,)
+        ) as executor:
+            futures = [
+                (
+                    font_path,
+                    executor.submit(
+                        _apply_in_worker, font_path, output_path, additional_locations
+                    ),
+                )
+                for font_path, output_path, additional_locations in font_jobs
+            ]
+            for font_path, future in futures:
+                try:
+                    future.result()
+                except (Error, OSError, fontTools.ttLib.TTLibError) as e:
+                    failures.append((font_path, _error_messages(e)))
+                except Exception as e:
+                    # Also covers a crashed worker process.
+                    logging.debug("Unexpected error for '%s'", font_path, exc_info=True)
+                    failures.append((font_path, [f"{type(e).__name__}: {e}"]))
+
+    for font_path, messages in failures:
+        for message in messages:
+            logging.error(
+                "Cannot apply Stylespace to font '%s': %s", font_path, message
+            )
+    if failures:
+        sys.exit(1)
+
+
+def _serve(args: List[str]) -> None:
+    import socketserver
+
+    if not hasattr(socketserver, "UnixStreamServer"):
+        logging.basicConfig(format="%(levelname)s: %(message)s")
+        logging.error("statmake serve needs Unix domain socket support.")
         sys.exit(1)
 
-    font.save(parsed_args.output_path or parsed_args.variable_font)
+    import statmake.server
+
+    statmake.server.main(args)
+
+
+# Standard input or output in place of a font path.
+_STDIO = Path("-")
+
+
+class _Profile(NamedTuple):
+    directory: Path
+    format: str
+    # The phases before the fonts are processed, shared by all fonts.
+    setup_phases: List[Dict[str, Any]]
+
+
+# The function _apply_in_worker calls, set up once per worker process.
+_worker_apply: Optional[Callable[[Path, Path, Mapping[str, float]], bool]] = None
+
+
+def _init_worker(apply: Callable[[Path, Path, Mapping[str, float]], bool]) -> None:
+    global _worker_apply
+    _worker_apply = apply
+
+
+def _apply_in_worker(
+    font_path: Path, output_path: Path, additional_locations: Mapping[str, float]
+) -> bool:
+    assert _worker_apply is not None
+    return _worker_apply(font_path, output_path, additional_locations)
+
+
+def _apply_to_font_file(
+    stylespace_index: "StylespaceIndex",
+    font_path: Path,
+    output_path: Path,
+    additional_locations: Mapping[str, float],
+    *,
+    mac_names: bool,
+    recompile: bool,
+    compact_names: bool,
+    result_cache: Optional["ResultCache"],
+    profile: Optional[_Profile],
+) -> bool:
+    """Apply the Stylespace to the font at font_path and save it to output_path.
+
+    Lives at module level so that it can be sent to worker processes.
+    """
+    import statmake.lib
+
+    apply = functools.partial(
+        _apply_to_stdio
+        if _STDIO in (font_path, output_path)
+        else statmake.lib.apply_stylespace_to_font_file,
+        stylespace_index.stylespace,
+        font_path,
+        output_path,
+        additional_locations,
+        mac_names=mac_names,
+        recompile=recompile,
+        stylespace_index=stylespace_index,
+        compact_names=compact_names,
+        result_cache=result_cache,
+    )
+    recorder = None
+    if compact_names or (profile is not None and profile.format == "json"):
+        # Also used to report what compacting the name table saved.
+        recorder = statmake.lib.PhaseRecorder()
+        apply = functools.partial(apply, instrumentation=recorder)
+    hits_before = result_cache.hits if result_cache is not None else 0
+    if profile is None:
+        written = apply()
+    elif profile.format == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            written = profiler.runcall(apply)
+        finally:
+            profiler.dump_stats(profile.directory / f"{_profile_name(font_path)}.prof")
+    else:
+        assert recorder is not None
+        try:
+            written = apply()
+        finally:
+            report = {
+                "font": str(font_path),
+                "setup_phases": profile.setup_phases,
+                "phases": recorder.phases,
+            }
+            (profile.directory / f"{_profile_name(font_path)}.json").write_text(
+                json.dumps(report, indent=2) + "\n", encoding="utf-8"
+            )
+    if result_cache is not None and result_cache.hits > hits_before:
+        logging.info("Reused the cached tables for '%s'.", font_path)
+    for phase in recorder.phases if recorder is not None else ():
+        if phase["name"] == "compact_name_table":
+            logging.info(
+                "Compacted the name table of '%s': removed %d records, saved %d bytes.",
+                font_path,
+                phase["counts"]["name_records_removed"],
+                phase["counts"]["bytes_saved"],
+            )
+    if not written:
+        logging.info("'%s' is already up to date.", font_path)
+    return written
+
+
+def _apply_to_stdio(
+    stylespace: "Stylespace",
+    font_path: Path,
+    output_path: Path,
+    additional_locations: Mapping[str, float],
+    **kwargs: Any,
+) -> bool:
+    """Like `statmake.lib.apply_stylespace_to_font_file`, but the font is read from
+    standard input and/or written to standard output if the path is '-'.
+
+    The font is always written.
+    """
+    import statmake.lib
+
+    if font_path == _STDIO:
+        data = sys.stdin.buffer.read()
+    else:
+        data = font_path.read_bytes()
+    output = statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, additional_locations, **kwargs
+    )
+    if output_path == _STDIO:
+        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
+    else:
+        output_path.write_bytes(output)
+    return True
+
+
+def _error_messages(exception: Exception) -> List[str]:
+    """Return the messages of all issues the exception lists, or its own message,
+    so that all problems can be fixed at once."""
+    issues = getattr(exception, "issues", ())
+    return [issue.message for issue in issues] or [str(exception)]
+
+
+def _profile_name(font_path: Path) -> str:
+    return "stdin" if font_path == _STDIO else font_path.name
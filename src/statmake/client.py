@@ -0,0 +1,127 @@
+"""A thin client for `statmake serve`.
+
+Only uses the standard library, so that it starts quickly; all the font work
+happens in the server process.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+SOCKET_ENV = "STATMAKE_SOCKET"
+
+
+class Client:
+    """A connection to a `statmake serve` process.
+
+    Jobs are sent one per line as JSON objects, and the server answers each with one
+    line of JSON, in order. See `statmake.server` for the job keys.
+    """
+
+    def __init__(self, socket_path: Union[str, os.PathLike]) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(os.fspath(socket_path))
+        except OSError:
+            self._socket.close()
+            raise
+        self._reader = self._socket.makefile("rb")
+
+    def close(self) -> None:
+        self._reader.close()
+        self._socket.close()
+
+    def submit(self, jobs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Send all jobs and yield the server's responses, in the same order."""
+        self._socket.sendall(
+            b"".join(json.dumps(job).encode("utf-8") + b"\n" for job in jobs)
+        )
+        for _ in jobs:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("The statmake server closed the connection.")
+            yield json.loads(line)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+
+    parser = argparse.ArgumentParser(
+        description="Send STAT jobs to a running `statmake serve` process."
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=os.environ.get(SOCKET_ENV),
+        help=(
+            "The path to the server's Unix socket. Can also be set with the "
+            f"{SOCKET_ENV} environment variable."
+        ),
+    )
+    parser.add_argument("--stylespace", type=Path)
+    parser.add_argument("--designspace", "-m", required=True, type=Path)
+    parser.add_argument("--output-path", type=Path)
+    parser.add_argument("--output-dir", type=Path)
+    parser.add_argument("--mac-names", action="store_true")
+    parser.add_argument("--recompile", action="store_true")
+    parser.add_argument("--compact-names", action="store_true")
+    parser.add_argument("variable_fonts", metavar="variable_font", nargs="+", type=Path)
+    parsed_args = parser.parse_args(args)
+    if parsed_args.socket is None:
+        parser.error(f"Pass --socket or set the {SOCKET_ENV} environment variable.")
+    if parsed_args.output_path and len(parsed_args.variable_fonts) > 1:
+        parser.error(
+            "--output-path can only be used with a single variable font, use "
+            "--output-dir instead."
+        )
+    if parsed_args.output_path and parsed_args.output_dir:
+        parser.error("--output-path and --output-dir are mutually exclusive.")
+
+    # The server has its own working directory.
+    jobs = []
+    for font_path in parsed_args.variable_fonts:
+        job: Dict[str, Any] = {
+            "font": str(font_path.absolute()),
+            "designspace": str(parsed_args.designspace.absolute()),
+            "mac_names": parsed_args.mac_names,
+            "recompile": parsed_args.recompile,
+            "compact_names": parsed_args.compact_names,
+        }
+        if parsed_args.stylespace:
+            job["stylespace"] = str(parsed_args.stylespace.absolute())
+        if parsed_args.output_path:
+            job["output"] = str(parsed_args.output_path.absolute())
+        elif parsed_args.output_dir:
+            job["output"] = str((parsed_args.output_dir / font_path.name).absolute())
+        jobs.append(job)
+
+    try:
+        with contextlib.closing(Client(parsed_args.socket)) as client:
+            responses = list(client.submit(jobs))
+    except OSError as e:
+        logging.error("Cannot talk to the statmake server: %s", e)
+        sys.exit(1)
+
+    failed = False
+    for font_path, response in zip(parsed_args.variable_fonts, responses):
+        if not response.get("ok"):
+            failed = True
+            issues = response.get("issues") or [{"message": response.get("error")}]
+            for issue in issues:
+                logging.error(
+                    "Cannot apply Stylespace to font '%s': %s",
+                    font_path,
+                    issue["message"],
+                )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,51 @@
+from typing import NamedTuple, Optional, Sequence, Type, TypeVar
+
+E = TypeVar("E", bound="Error")
+
+
+class Issue(NamedTuple):
+    """A problem found in a Stylespace, or between a Stylespace and a font.
+
+    kind: A short identifier of the kind of problem, e.g. "duplicate_value" or
+    "missing_stop".
+
+    message: A human-readable description of the problem.
+
+    axis: The name of the axis the problem is on, if any.
+
+    value: The offending value on that axis, if any.
+
+    location: The name of the offending Stylespace location or font instance, if
+    any.
+    """
+
+    kind: str
+    message: str
+    axis: Optional[str] = None
+    value: Optional[float] = None
+    location: Optional[str] = None
+
+
 class Error(Exception):
-    """Base exception."""
+    """Base exception.
+
+    issues: All problems found, if the exception was raised by a check that
+    collects them instead of stopping at the first one, see `Error.from_issues`.
+    """
+
+    def __init__(self, *args: object, issues: Sequence[Issue] = ()) -> None:
+        super().__init__(*args)
+        self.issues = tuple(issues)
+
+    @classmethod
+    def from_issues(cls: Type[E], issues: Sequence[Issue]) -> E:
+        """Construct an exception for a non-empty list of issues, with the first
+        issue as the message."""
+        message = issues[0].message
+        more = len(issues) - 1
+        if more:
+            message += f" ({more} more {'issue' if more == 1 else 'issues'} found)"
+        return cls(message, issues=issues)
 
 
 class StylespaceError(Error):
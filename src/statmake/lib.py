@@ -1,11 +1,44 @@
 import collections
-from typing import Any, Dict, List, Mapping, Set, Tuple, Union
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import secrets
+import shutil
+import threading
+import time
+import weakref
+from typing import (
+    AbstractSet,
+    Any,
+    BinaryIO,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
+import attrs
+import fontTools
+import fontTools.designspaceLib
 import fontTools.otlLib.builder
 import fontTools.ttLib
+import fontTools.ttLib.sfnt
 
+import statmake.cache
 import statmake.classes
-from statmake.errors import Error
+import statmake.names
+from statmake.errors import Error, Issue
 
 
 def apply_stylespace_to_variable_font(
@@ -13,9 +46,16 @@ def apply_stylespace_to_variable_font(
     varfont: fontTools.ttLib.TTFont,
     additional_locations: Mapping[str, float],
     mac_names: bool = False,
-) -> None:
+    stylespace_index: Optional["StylespaceIndex"] = None,
+    instrumentation: Optional["Instrumentation"] = None,
+    compact_names: bool = False,
+    result_cache: Optional["ResultCache"] = None,
+) -> bool:
     """Generate and apply a STAT table to a variable font.
 
+    Returns whether the compiled fvar, STAT, name or ltag table differs from the one
+    the font had before, i.e. whether the font needs to be saved at all.
+
     additional_locations: used in subset Designspaces to express where on which other
     axes not defined by an <axis> element the varfont stands. The primary use-case is
     defining a complete STAT table for variable fonts that do not include all axes of a
@@ -24,20 +64,710 @@ def apply_stylespace_to_variable_font(
 
     mac_names: Whether to add a platformID=1 name record for every platformID=3 record.
     Off by default, because these are deprecated.
+
+    stylespace_index: The `StylespaceIndex` of the Stylespace, to avoid recomputing
+    it when applying the same Stylespace to many fonts. Raises ValueError if it was
+    built from a different Stylespace.
+
+    instrumentation: Receives the timings of the individual phases, see
+    `Instrumentation`.
+
+    compact_names: Whether to merge identical names and drop the names no table
+    uses anymore afterwards, see `statmake.names.compact_name_table`.
+
+    result_cache: Reuse the tables from an earlier run with the same Stylespace,
+    fvar and name tables and options instead of building them again, see
+    `ResultCache`.
+    """
+
+    if (
+        stylespace_index is not None
+        and stylespace_index.stylespace is not stylespace
+        and stylespace_index.stylespace != stylespace
+    ):
+        raise ValueError("The StylespaceIndex was built from a different Stylespace.")
+    if result_cache is not None:
+        with instrument_phase(instrumentation, "result_cache_lookup") as counts:
+            # The data of tables that are not loaded yet is read as is, without
+            # decompiling and compiling them.
+            data_before = _table_data(varfont, _PATCHED_TABLES)
+            key = _result_cache_key(
+                result_cache.fingerprint(stylespace),
+                varfont,
+                data_before,
+                additional_locations,
+                mac_names,
+                compact_names,
+            )
+            tables = result_cache.get(key)
+            counts["hit"] = int(tables is not None)
+        if tables is not None:
+            with instrument_phase(instrumentation, "load_cached_tables"):
+                _replace_tables(varfont, _PATCHED_TABLES, tables)
+            # Fonts statmake wrote before contain the tables as fontTools compiles
+            # them, so they compare equal if nothing changed.
+            return tables != data_before
+
+    with instrument_phase(instrumentation, "index_name_table") as counts:
+        name_index = None
+        if "name" in varfont:
+            name_index = statmake.names.NameTableIndex(varfont)
+            counts["name_records"] = len(varfont["name"].names)
+    with instrument_phase(instrumentation, "generate_builder_data") as counts:
+        axes, locations, elided_fallback_name = _generate_builder_data(
+            stylespace,
+            varfont,
+            additional_locations,
+            stylespace_index,
+            name_index,
+            instrumentation,
+        )
+        counts["instances"] = len(varfont["fvar"].instances)
+    with instrument_phase(instrumentation, "compile_tables_before"):
+        tables_before = _compile_tables(varfont, _PATCHED_TABLES)
+    if name_index is not None:
+        with instrument_phase(instrumentation, "resolve_names") as counts:
+            name_records_before = len(varfont["name"].names)
+            axes, locations, elided_fallback_name = _resolve_names(
+                name_index, axes, locations, elided_fallback_name, mac_names
+            )
+            counts["name_records_added"] = (
+                len(varfont["name"].names) - name_records_before
+            )
+    with instrument_phase(instrumentation, "build_stat_table") as counts:
+        fontTools.otlLib.builder.buildStatTable(
+            varfont, axes, locations, elided_fallback_name, macNames=mac_names
+        )
+        counts["axes"] = len(axes)
+        counts["axis_values"] = sum(len(axis["values"]) for axis in axes)
+        counts["format4_locations"] = len(locations)
+    if compact_names:
+        with instrument_phase(instrumentation, "compact_name_table") as counts:
+            name_records_before = len(varfont["name"].names)
+            counts["bytes_saved"] = statmake.names.compact_name_table(varfont)
+            counts["name_records_removed"] = name_records_before - len(
+                varfont["name"].names
+            )
+    with instrument_phase(instrumentation, "compile_tables_after"):
+        tables_after = _compile_tables(varfont, _PATCHED_TABLES)
+    if result_cache is not None:
+        result_cache.put(key, tables_after)
+    return tables_after != tables_before
+
+
+def apply_stylespace_to_font_file(
+    stylespace: statmake.classes.Stylespace,
+    font_path: Union[str, os.PathLike],
+    output_path: Optional[Union[str, os.PathLike]] = None,
+    additional_locations: Optional[Mapping[str, float]] = None,
+    mac_names: bool = False,
+    recompile: bool = False,
+    stylespace_index: Optional["StylespaceIndex"] = None,
+    instrumentation: Optional["Instrumentation"] = None,
+    compact_names: bool = False,
+    result_cache: Optional["ResultCache"] = None,
+) -> bool:
+    """Apply a Stylespace to the variable font file at font_path and save it to
+    output_path, or in-place if it is None.
+
+    By default, only the tables statmake touches are decompiled and all other tables
+    are copied through unchanged, see `load_font_for_patching`. Set recompile to load
+    and recompile the whole font with fontTools instead.
+
+    Returns whether the font was written. A font that is saved in-place is not
+    rewritten if its STAT and name tables are already up to date, to leave its
+    modification time alone.
+
+    See `apply_stylespace_to_variable_font` for the other arguments.
+    """
+    with instrument_phase(instrumentation, "load_font"):
+        font = _load_font(font_path, recompile)
+    with font:
+        changed = apply_stylespace_to_variable_font(
+            stylespace,
+            font,
+            additional_locations or {},
+            mac_names=mac_names,
+            stylespace_index=stylespace_index,
+            instrumentation=instrumentation,
+            compact_names=compact_names,
+            result_cache=result_cache,
+        )
+        if output_path is None:
+            output_path = font_path
+        if not changed and os.path.realpath(output_path) == os.path.realpath(font_path):
+            return False
+        with instrument_phase(instrumentation, "save_font"):
+            _save_font(font, output_path, recompile)
+    return True
+
+
+def apply_stylespace_to_font_bytes(
+    stylespace: statmake.classes.Stylespace,
+    data: bytes,
+    additional_locations: Optional[Mapping[str, float]] = None,
+    mac_names: bool = False,
+    recompile: bool = False,
+    stylespace_index: Optional["StylespaceIndex"] = None,
+    instrumentation: Optional["Instrumentation"] = None,
+    compact_names: bool = False,
+    result_cache: Optional["ResultCache"] = None,
+) -> bytes:
+    """Apply a Stylespace to the variable font in data and return the modified
+    font, all in memory.
+
+    Returns data itself if the font's STAT and name tables are already up to date.
+    See `apply_stylespace_to_font_file` for the other arguments.
     """
+    with instrument_phase(instrumentation, "load_font"):
+        font = _load_font(io.BytesIO(data), recompile)
+    changed = apply_stylespace_to_variable_font(
+        stylespace,
+        font,
+        additional_locations or {},
+        mac_names=mac_names,
+        stylespace_index=stylespace_index,
+        instrumentation=instrumentation,
+        compact_names=compact_names,
+        result_cache=result_cache,
+    )
+    if not changed:
+        return data
+    buffer = io.BytesIO()
+    with instrument_phase(instrumentation, "save_font"):
+        _save_font(font, buffer, recompile)
+    return buffer.getvalue()
+
+
+def apply_stylespace_to_fonts(
+    stylespace: statmake.classes.Stylespace,
+    fonts: Sequence[Union[fontTools.ttLib.TTFont, str, os.PathLike]],
+    additional_locations: Optional[Mapping[str, float]] = None,
+    mac_names: bool = False,
+    recompile: bool = False,
+    executor: Optional[concurrent.futures.Executor] = None,
+    compact_names: bool = False,
+    result_cache: Optional["ResultCache"] = None,
+) -> List[bool]:
+    """Apply a Stylespace to many fonts, concurrently if an executor is given.
+
+    fonts can mix loaded `TTFont` objects, which are modified in place, and paths to
+    font files, which are saved in place. Returns for each font, in order, whether
+    it changed or was written, see `apply_stylespace_to_variable_font` and
+    `apply_stylespace_to_font_file`. If any font fails, the exception of the first
+    failed one in the order of fonts is raised.
 
-    axes, locations, elided_fallback_name = _generate_builder_data(
-        stylespace, varfont, additional_locations
+    executor: E.g. a `concurrent.futures.ThreadPoolExecutor`. Stylespaces are
+    immutable and the work on a font touches nothing but that font, so one
+    Stylespace can be applied from many threads at once, as long as every TTFont
+    is only passed once. A `concurrent.futures.ProcessPoolExecutor` only accepts
+    paths, as changes to a TTFont in another process would be lost. With None, the
+    fonts are processed one after the other in the calling thread.
+
+    See `apply_stylespace_to_font_file` for the other arguments.
+    """
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor) and any(
+        isinstance(font, fontTools.ttLib.TTFont) for font in fonts
+    ):
+        raise TypeError(
+            "TTFont objects cannot be processed in other processes, pass paths to "
+            "font files instead."
+        )
+    apply = functools.partial(
+        _apply_to_font,
+        stylespace,
+        additional_locations or {},
+        mac_names=mac_names,
+        recompile=recompile,
+        stylespace_index=StylespaceIndex.from_stylespace(stylespace),
+        compact_names=compact_names,
+        result_cache=result_cache,
     )
-    fontTools.otlLib.builder.buildStatTable(
-        varfont, axes, locations, elided_fallback_name, macNames=mac_names
+    if executor is None:
+        return [apply(font) for font in fonts]
+    return list(executor.map(apply, fonts))
+
+
+def find_issues(
+    stylespace: statmake.classes.Stylespace,
+    varfont: fontTools.ttLib.TTFont,
+    additional_locations: Mapping[str, float],
+) -> List[Issue]:
+    """Check the Stylespace and whether it can be applied to the variable font, and
+    return all problems found instead of stopping at the first one.
+
+    Applying a Stylespace raises an `Error` whose `issues` lists the problems with
+    the font, and loading a Stylespace raises a `StylespaceError` whose `issues`
+    lists the problems with the Stylespace itself. This function finds both kinds at
+    once, e.g. for a Stylespace loaded with `Stylespace.from_dict(...,
+    validate=False)`. An empty list means the Stylespace can be applied.
+
+    See `apply_stylespace_to_variable_font` for the arguments.
+    """
+    issues = stylespace.find_issues()
+    # Like StylespaceIndex, but tolerating named locations with unknown axes.
+    name_to_tag = {axis.name.default: axis.tag for axis in stylespace.axes}
+    stylespace_stops = {
+        axis.tag: {location.value for location in axis.locations}
+        for axis in stylespace.axes
+    }
+    for named_location in stylespace.locations:
+        for name, value in named_location.axis_values.items():
+            if name in name_to_tag:
+                stylespace_stops[name_to_tag[name]].add(value)
+
+    issues.extend(_sanity_check(stylespace, varfont, additional_locations, name_to_tag))
+    if "fvar" in varfont:
+        _axis_stops(
+            varfont, additional_locations, name_to_tag, stylespace_stops, None, issues
+        )
+    return issues
+
+
+class Instrumentation:
+    """Receives the start and end of the phases statmake goes through, e.g. to
+    find out where the time goes when a build is slow.
+
+    Subclass it and override the methods, or use `PhaseRecorder`. Phases can nest,
+    e.g. `sanity_check` runs within `generate_builder_data`. The phase names are
+    not part of the stable API.
+    """
+
+    def phase_started(self, name: str) -> None:
+        """Called when the phase starts."""
+
+    def phase_finished(
+        self, name: str, duration: float, counts: Mapping[str, int]
+    ) -> None:
+        """Called when the phase ends, also if it raised an exception.
+
+        duration is in seconds. counts holds phase-specific numbers, like the
+        number of axis values emitted or name records added.
+        """
+
+
+class PhaseRecorder(Instrumentation):
+    """Records all finished phases in order."""
+
+    def __init__(self) -> None:
+        self.phases: List[Dict[str, Any]] = []
+
+    def phase_finished(
+        self, name: str, duration: float, counts: Mapping[str, int]
+    ) -> None:
+        self.phases.append({"name": name, "duration": duration, "counts": counts})
+
+
+@contextlib.contextmanager
+def instrument_phase(
+    instrumentation: Optional[Instrumentation], name: str
+) -> Iterator[Dict[str, int]]:
+    """Report the code run in the with block as a phase to instrumentation, if any.
+
+    Yields a dict that the block can put counts into.
+    """
+    counts: Dict[str, int] = {}
+    if instrumentation is None:
+        yield counts
+        return
+    instrumentation.phase_started(name)
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        instrumentation.phase_finished(name, time.perf_counter() - start, counts)
+
+
+@attrs.frozen
+class StylespaceIndex:
+    """Lookups derived from a Stylespace that are the same for every font.
+
+    Build it once with `StylespaceIndex.from_stylespace` and pass it to
+    `apply_stylespace_to_variable_font` when applying the same Stylespace to many
+    fonts, so that the per-font work is limited to reading the font's stops.
+    """
+
+    stylespace: statmake.classes.Stylespace
+    name_to_tag: Mapping[str, str]
+    # Axis tag to all values the Stylespace has entries for.
+    stylespace_stops: Mapping[str, FrozenSet[float]]
+    # Axis tag to (value, builder dict) for every location on the axis.
+    axis_values: Mapping[str, List[Tuple[float, Dict[str, Any]]]]
+    # The builder dicts of the format 4 locations, with locations keyed by axis tag.
+    named_locations: List[Dict[str, Any]]
+    # Inverted index of the format 4 locations: axis tag to value to the indices
+    # into named_locations of the locations that have that value on the axis.
+    location_postings: Mapping[str, Mapping[float, FrozenSet[int]]]
+    elided_fallback: Union[int, Dict[str, str]]
+
+    @classmethod
+    def from_stylespace(
+        cls, stylespace: statmake.classes.Stylespace
+    ) -> "StylespaceIndex":
+        name_to_tag = {a.name.default: a.tag for a in stylespace.axes}
+
+        stylespace_stops: Dict[str, Set[float]] = {}
+        axis_values: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        for axis in stylespace.axes:
+            stylespace_stops[axis.tag] = {location.value for location in axis.locations}
+            axis_values[axis.tag] = [
+                (location.value, location.to_builder_dict())
+                for location in axis.locations
+            ]
+        location_postings: Dict[str, Dict[float, Set[int]]] = {
+            axis.tag: collections.defaultdict(set) for axis in stylespace.axes
+        }
+        for location_id, named_location in enumerate(stylespace.locations):
+            for name, value in named_location.axis_values.items():
+                stylespace_stops[name_to_tag[name]].add(value)
+                location_postings[name_to_tag[name]][value].add(location_id)
+
+        elided_fallback: Union[int, Dict[str, str]]
+        if isinstance(stylespace.elided_fallback_name_id, int):
+            # Use a raw name ID directly.
+            elided_fallback = stylespace.elided_fallback_name_id
+        else:
+            # Otherwise, unwrap into the format that the builder expects.
+            elided_fallback = dict(stylespace.elided_fallback_name_id.mapping)
+
+        return cls(
+            stylespace=stylespace,
+            name_to_tag=name_to_tag,
+            stylespace_stops={k: frozenset(v) for k, v in stylespace_stops.items()},
+            axis_values=axis_values,
+            named_locations=[
+                named_location.to_builder_dict(name_to_tag)
+                for named_location in stylespace.locations
+            ],
+            location_postings={
+                tag: {value: frozenset(ids) for value, ids in postings.items()}
+                for tag, postings in location_postings.items()
+            },
+            elided_fallback=elided_fallback,
+        )
+
+
+class ResultCache:
+    """An on-disk cache of the tables `apply_stylespace_to_variable_font` produces.
+
+    Entries are keyed by the Stylespace's `fingerprint`, the compiled fvar and name
+    tables the font had before, its ltag table, the additional locations and the
+    options, so a font whose outlines changed but whose fvar and name tables did not
+    gets the cached fvar, STAT, name and ltag tables without running the checks or
+    building the STAT table. Entries are evicted in least-recently-used order once
+    they take up more than max_size bytes, see `statmake.cache.DiskCache`.
+
+    hits and misses count the lookups made through this object. It can be shared
+    between threads and pickled to worker processes, which then count their own
+    lookups and compute their own fingerprints.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        max_size: int = statmake.cache.DEFAULT_MAX_SIZE,
+    ) -> None:
+        self._cache = statmake.cache.DiskCache(directory, ".tables.pickle", max_size)
+        self._lock = threading.Lock()
+        # The fingerprints of the live Stylespaces seen, by identity, as computing
+        # one takes about as long as loading the Stylespace. An entry is dropped
+        # when its Stylespace is garbage collected.
+        self._fingerprints: Dict[
+            int, Tuple[weakref.ref[statmake.classes.Stylespace], str]
+        ] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"cache": self._cache}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self._cache = state["cache"]
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, stylespace: statmake.classes.Stylespace) -> str:
+        """Return `Stylespace.fingerprint`, computed once per Stylespace object."""
+        key = id(stylespace)
+        with self._lock:
+            entry = self._fingerprints.get(key)
+        if entry is not None and entry[0]() is stylespace:
+            return entry[1]
+        fingerprint = stylespace.fingerprint()
+
+        # Runs before the id can be reused. Does not take the lock, because garbage
+        # collection can run while it is held.
+        def forget(_ref: "weakref.ref[statmake.classes.Stylespace]") -> None:
+            self._fingerprints.pop(key, None)
+
+        with self._lock:
+            self._fingerprints[key] = (weakref.ref(stylespace, forget), fingerprint)
+        return fingerprint
+
+    def get(self, key: str) -> Optional[Tuple[Optional[bytes], ...]]:
+        """Return the compiled tables stored under key, or None if there are
+        none."""
+        data = self._cache.get(key)
+        tables = None
+        if data is not None:
+            try:
+                tables = pickle.loads(data)
+            except (pickle.UnpicklingError, EOFError, TypeError, ValueError):
+                pass  # A corrupt entry, rebuild it.
+        if not (
+            isinstance(tables, tuple)
+            and len(tables) == len(_PATCHED_TABLES)
+            and all(table is None or isinstance(table, bytes) for table in tables)
+        ):
+            tables = None
+        with self._lock:
+            if tables is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return tables
+
+    def put(self, key: str, tables: Tuple[Optional[bytes], ...]) -> None:
+        """Store the compiled tables under key."""
+        self._cache.put(key, pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+@attrs.frozen
+class DesignspaceVariableFont:
+    """A variable font declared in a Designspace, with the locations on the axes it
+    does not contain."""
+
+    name: str
+    # The file name of the built font, relative to the directory it was built into.
+    filename: str
+    additional_locations: Mapping[str, float]
+
+
+def variable_fonts_from_designspace(
+    designspace: fontTools.designspaceLib.DesignSpaceDocument,
+) -> List[DesignspaceVariableFont]:
+    """Return the variable fonts a Designspace declares, in document order.
+
+    Designspace 5 documents can declare several `<variable-font>` elements that each
+    cover a subset of the axes. Axes a variable font pins to a single value with an
+    `<axis-subset userValue="...">` and axes it does not mention at all (which sit at
+    their default) become its additional locations, merged over the Designspace lib's
+    `org.statmake.additionalLocations`. The variable font's own lib can override them
+    with the same key. Documents without `<variable-font>` elements describe a single
+    variable font covering all axes, or one per location on the discrete axes.
+
+    Additional locations are keyed by the English name the axis gets in the fvar
+    table, like the axes in Stylespaces, not by the Designspace axis name.
+
+    Fonts without a filename are assumed to be `<name>.ttf`.
+    """
+    document_additional_locations = designspace.lib.get(
+        "org.statmake.additionalLocations", {}
     )
+    variable_fonts = []
+    for variable_font in designspace.getVariableFonts():
+        subsets = {subset.name: subset for subset in variable_font.axisSubsets}
+        additional_locations: Dict[str, float] = dict(document_additional_locations)
+        for axis in designspace.axes:
+            subset = subsets.get(axis.name)
+            if subset is None:
+                additional_locations[_axis_label_name(axis)] = axis.default
+            elif isinstance(subset, fontTools.designspaceLib.ValueAxisSubsetDescriptor):
+                additional_locations[_axis_label_name(axis)] = subset.userValue
+        additional_locations.update(
+            variable_font.lib.get("org.statmake.additionalLocations", {})
+        )
+        variable_fonts.append(
+            DesignspaceVariableFont(
+                name=variable_font.name,
+                filename=variable_font.filename or f"{variable_font.name}.ttf",
+                additional_locations=additional_locations,
+            )
+        )
+    return variable_fonts
+
+
+# The English names fontTools.varLib gives registered axes without label names.
+_STANDARD_AXIS_NAMES = {
+    "weight": "Weight",
+    "width": "Width",
+    "slant": "Slant",
+    "optical": "Optical Size",
+    "italic": "Italic",
+}
+
+
+def _axis_label_name(axis: fontTools.designspaceLib.AxisDescriptor) -> str:
+    """Return the English name fontTools.varLib uses for the axis in the fvar
+    table."""
+    if "en" in axis.labelNames:
+        return axis.labelNames["en"]
+    if not axis.labelNames and axis.name in _STANDARD_AXIS_NAMES:
+        return _STANDARD_AXIS_NAMES[axis.name]
+    return axis.name
+
+
+def load_font_for_patching(
+    font_path: Union[str, os.PathLike, BinaryIO],
+) -> fontTools.ttLib.TTFont:
+    """Open a font so that only the tables statmake touches get decompiled.
+
+    Bounding box and timestamp recalculation is disabled, because it would
+    otherwise pull in the `head` table and the outlines on save. Use together with
+    `save_patched`.
+
+    The font is read lazily. Font files are memory-mapped, so that the tables
+    statmake does not touch stay backed by the page cache instead of being read
+    into memory, until `save_patched` copies them one by one. Close the font when
+    done with it to release the mapping. On Windows, where a mapped file cannot be
+    replaced, font files are read into memory instead.
+    """
+    if isinstance(font_path, (str, os.PathLike)):
+        if os.name == "nt":
+            return fontTools.ttLib.TTFont(
+                font_path, recalcBBoxes=False, recalcTimestamp=False
+            )
+        with open(font_path, "rb") as fp:
+            try:
+                font_data: Union[mmap.mmap, BinaryIO] = mmap.mmap(
+                    fp.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:  # Empty files cannot be mapped.
+                font_data = io.BytesIO()
+        return fontTools.ttLib.TTFont(
+            font_data, lazy=True, recalcBBoxes=False, recalcTimestamp=False
+        )
+    return fontTools.ttLib.TTFont(
+        font_path, lazy=True, recalcBBoxes=False, recalcTimestamp=False
+    )
+
+
+def save_patched(
+    varfont: fontTools.ttLib.TTFont, output_path: Union[str, os.PathLike, BinaryIO]
+) -> None:
+    """Save a font, copying every table that was not decompiled through
+    byte-for-byte.
+
+    Only the tables that were loaded (normally `fvar`, `name` and `STAT`) are
+    compiled. The table directory, the table checksums and the `head` table's
+    checkSumAdjustment are recomputed by the writer. Tables are written in the
+    order recommended by the OpenType specification, like `TTFont.save` does.
+
+    Tables are streamed to the output one at a time, so at most one table is held
+    in memory. A font file is written next to output_path first and then moved into
+    place, so output_path can be the file the font was loaded from. A symlinked
+    output_path is written through the link, and a hardlinked one is overwritten
+    in place, so that the links keep pointing at the patched font. output_path can
+    also be a binary file object.
+
+    Fonts with a flavor (WOFF, WOFF2) are saved with `TTFont.save`.
+    """
+    if not isinstance(output_path, (str, os.PathLike)):
+        _write_patched(varfont, output_path)
+        return
+
+    target_path = os.path.realpath(output_path)
+    # Created like a regular file so that the umask applies, unlike for tempfile.
+    tmp_path = f"{target_path}.{secrets.token_hex(8)}.tmp"
+    try:
+        with open(tmp_path, "xb") as fp:
+            _write_patched(varfont, fp)
+        try:
+            target_stat = os.stat(target_path)
+        except FileNotFoundError:
+            os.replace(tmp_path, target_path)
+            return
+        if target_stat.st_nlink > 1:
+            # Replacing the file would detach it from its other hardlinks.
+            shutil.copyfile(tmp_path, target_path)
+            os.unlink(tmp_path)
+        else:
+            shutil.copymode(target_path, tmp_path)
+            os.replace(tmp_path, target_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write_patched(varfont: fontTools.ttLib.TTFont, fp: BinaryIO) -> None:
+    if varfont.flavor is not None:
+        varfont.save(fp)
+        return
+
+    # Already in the recommended table order.
+    tags = varfont.keys()
+    tags.pop(0)  # skip GlyphOrder tag
+    writer = fontTools.ttLib.sfnt.SFNTWriter(fp, len(tags), varfont.sfntVersion)
+    for tag in tags:
+        # Returns the raw data from the input file for tables that are not loaded.
+        writer[tag] = varfont.getTableData(tag)
+    writer.close()
+
+
+def _apply_to_font(
+    stylespace: statmake.classes.Stylespace,
+    additional_locations: Mapping[str, float],
+    font: Union[fontTools.ttLib.TTFont, str, os.PathLike],
+    *,
+    mac_names: bool,
+    recompile: bool,
+    stylespace_index: StylespaceIndex,
+    compact_names: bool,
+    result_cache: Optional["ResultCache"],
+) -> bool:
+    """Apply the Stylespace to a loaded font or a font file, for
+    `apply_stylespace_to_fonts`."""
+    if isinstance(font, fontTools.ttLib.TTFont):
+        return apply_stylespace_to_variable_font(
+            stylespace,
+            font,
+            additional_locations,
+            mac_names=mac_names,
+            stylespace_index=stylespace_index,
+            compact_names=compact_names,
+            result_cache=result_cache,
+        )
+    return apply_stylespace_to_font_file(
+        stylespace,
+        font,
+        additional_locations=additional_locations,
+        mac_names=mac_names,
+        recompile=recompile,
+        stylespace_index=stylespace_index,
+        compact_names=compact_names,
+        result_cache=result_cache,
+    )
+
+
+def _load_font(
+    font_path: Union[str, os.PathLike, BinaryIO], recompile: bool
+) -> fontTools.ttLib.TTFont:
+    if recompile:
+        return fontTools.ttLib.TTFont(font_path)
+    return load_font_for_patching(font_path)
+
+
+def _save_font(
+    font: fontTools.ttLib.TTFont,
+    output_path: Union[str, os.PathLike, BinaryIO],
+    recompile: bool,
+) -> None:
+    if recompile:
+        font.save(output_path)
+    else:
+        save_patched(font, output_path)
 
 
 def _generate_builder_data(
     stylespace: statmake.classes.Stylespace,
     varfont: fontTools.ttLib.TTFont,
     additional_locations: Mapping[str, float],
+    stylespace_index: Optional[StylespaceIndex] = None,
+    name_index: Optional[statmake.names.NameTableIndex] = None,
+    instrumentation: Optional[Instrumentation] = None,
 ) -> Tuple[
     List[Mapping[str, Any]], List[Mapping[str, Any]], Union[int, Dict[str, str]]
 ]:
@@ -58,48 +788,37 @@ def _generate_builder_data(
         5. The font must get a location for every axis the Stylespace contains.
     """
 
-    name_to_tag = {a.name.default: a.tag for a in stylespace.axes}
-    _sanity_check(stylespace, varfont, additional_locations, name_to_tag)
-
-    # First, determine which stops are used on which axes. The STAT table must contain
-    # a name for each stop that is used on each axis, so each stop must have an entry
-    # in the Stylespace. Also include locations in additional_locations that can refer
-    # to axes not present in the current varfont.
-    stylespace_stops: Dict[str, Set[float]] = {}
-    for axis in stylespace.axes:
-        stylespace_stops[axis.tag] = {location.value for location in axis.locations}
-    for named_location in stylespace.locations:
-        for name, value in named_location.axis_values.items():
-            stylespace_stops[name_to_tag[name]].add(value)
-
-    axis_stops: Mapping[str, Set[float]] = collections.defaultdict(set)  # tag to stops
-    for instance in varfont["fvar"].instances:
-        for k, v in instance.coordinates.items():
-            if v not in stylespace_stops[k]:
-                raise Error(
-                    f"There is no Stylespace entry for stop {v} on the '{k}' axis."
-                )
-            axis_stops[k].add(v)
-
-    for k, v in additional_locations.items():
-        axis_tag = name_to_tag[k]
-        if v not in stylespace_stops[axis_tag]:
-            raise Error(
-                f"There is no Stylespace entry for stop {v} on the '{k}' axis (from "
-                "additional locations)."
-            )
-        axis_stops[axis_tag].add(v)
+    if stylespace_index is None:
+        with instrument_phase(instrumentation, "build_stylespace_index"):
+            stylespace_index = StylespaceIndex.from_stylespace(stylespace)
+    name_to_tag = stylespace_index.name_to_tag
+    with instrument_phase(instrumentation, "sanity_check"):
+        issues = _sanity_check(
+            stylespace, varfont, additional_locations, name_to_tag, name_index
+        )
+    if "fvar" not in varfont:
+        raise Error.from_issues(issues)
+    axis_stops = _axis_stops(
+        varfont,
+        additional_locations,
+        name_to_tag,
+        stylespace_index.stylespace_stops,
+        name_index,
+        issues,
+    )
+    if issues:
+        raise Error.from_issues(issues)
 
     # Generate formats 1, 2 and 3.
     builder_axes: List[Mapping[str, Any]] = [
         {
             "tag": axis.tag,
-            "name": axis.name.mapping,
+            "name": dict(axis.name.mapping),
             "ordering": axis.ordering,
             "values": [
-                location.to_builder_dict()
-                for location in axis.locations
-                if location.value in axis_stops[axis.tag]
+                builder_dict
+                for value, builder_dict in stylespace_index.axis_values[axis.tag]
+                if value in axis_stops[axis.tag]
             ],
         }
         for axis in stylespace.axes
@@ -107,23 +826,43 @@ def _generate_builder_data(
 
     # Generate format 4.
     builder_locations: List[Mapping[str, Any]] = [
-        named_location.to_builder_dict(name_to_tag)
-        for named_location in stylespace.locations
-        if all(
-            name_to_tag[k] in axis_stops and v in axis_stops[name_to_tag[k]]
-            for k, v in named_location.axis_values.items()
-        )
+        stylespace_index.named_locations[location_id]
+        for location_id in _applicable_named_locations(stylespace_index, axis_stops)
     ]
 
-    elided_fallback: Union[int, Mapping[str, str]]
-    if isinstance(stylespace.elided_fallback_name_id, int):
-        # Use a raw name ID directly.
-        elided_fallback = stylespace.elided_fallback_name_id
-    else:
-        # Otherwise, unwrap into the format that the builder expects.
-        elided_fallback = dict(stylespace.elided_fallback_name_id.mapping)
+    return builder_axes, builder_locations, stylespace_index.elided_fallback
+
 
-    return builder_axes, builder_locations, elided_fallback
+def _applicable_named_locations(
+    stylespace_index: StylespaceIndex, axis_stops: Mapping[str, Set[float]]
+) -> List[int]:
+    """Return the sorted indices of the format 4 locations whose values are all
+    among the stops used in the font.
+
+    Intersects, over all axes, the union of the postings for the font's stops on
+    that axis, starting with the axis that matches the fewest locations.
+    """
+    if not stylespace_index.named_locations:
+        return []
+
+    axis_postings = []
+    for tag, postings in stylespace_index.location_postings.items():
+        stops = axis_stops.get(tag)
+        if not stops:
+            return []  # Every named location has a value on every axis.
+        matching = [postings[stop] for stop in stops if stop in postings]
+        axis_postings.append((sum(len(ids) for ids in matching), matching))
+    axis_postings.sort(key=lambda entry: entry[0])
+
+    candidates: Set[int] = set()
+    for index, (_, matching) in enumerate(axis_postings):
+        if index == 0:
+            candidates = candidates.union(*matching)
+        else:
+            candidates.intersection_update(set().union(*matching))
+        if not candidates:
+            return []
+    return sorted(candidates)
 
 
 def _sanity_check(
@@ -131,73 +870,339 @@ def _sanity_check(
     varfont: fontTools.ttLib.TTFont,
     additional_locations: Mapping[str, float],
     stylespace_name_to_tag: Mapping[str, str],
-) -> None:
-    """Ensures the input data contains no obvious faults."""
+    name_index: Optional[statmake.names.NameTableIndex] = None,
+) -> List[Issue]:
+    """Ensures the input data contains no obvious faults and returns all problems
+    found."""
 
     if "fvar" not in varfont:
-        raise Error(
-            "Need a variable font with the fvar table to determine which instances "
-            "are present."
-        )
+        return [
+            Issue(
+                "no_fvar",
+                "Need a variable font with the fvar table to determine which "
+                "instances are present.",
+            )
+        ]
+
+    issues: List[Issue] = []
 
     # Sanity check: only allow axis names in additional_locations that are present in
     # the Stylespace.
-    stylespace_names_set = set(stylespace_name_to_tag.keys())
-    additional_names_set = set(additional_locations.keys())
-    if not additional_names_set.issubset(stylespace_names_set):
-        surplus_keys = ", ".join(additional_names_set - stylespace_names_set)
-        raise Error(
-            "Additional locations must only contain axis names that are present in "
-            f"the Stylespace, the following aren't: {surplus_keys}."
-        )
+    for axis_name in additional_locations:
+        if axis_name not in stylespace_name_to_tag:
+            issues.append(
+                Issue(
+                    "unknown_additional_axis",
+                    "Additional locations must only contain axis names that are "
+                    f"present in the Stylespace, '{axis_name}' isn't.",
+                    axis_name,
+                    additional_locations[axis_name],
+                )
+            )
 
     # Sanity check: Ensure all font axes are present in the Stylespace and tags match.
-    font_name_to_tag = {
-        _default_name_string(varfont, axis.axisNameID): axis.axisTag
-        for axis in varfont["fvar"].axes
-    }
+    font_name_to_tag = {}
+    for axis in varfont["fvar"].axes:
+        try:
+            name = _default_name_string(varfont, axis.axisNameID, name_index)
+        except Error as e:
+            issues.append(Issue("missing_name", str(e)))
+            continue
+        font_name_to_tag[name] = axis.axisTag
     for name, tag in font_name_to_tag.items():
         if name not in stylespace_name_to_tag:
-            raise Error(
-                f"Font contains axis named '{name}' which is not in Stylespace. The "
-                "Stylespace must contain all axes any font from the same family "
-                "contains."
+            issues.append(
+                Issue(
+                    "unknown_font_axis",
+                    f"Font contains axis named '{name}' which is not in Stylespace. "
+                    "The Stylespace must contain all axes any font from the same "
+                    "family contains.",
+                    name,
+                )
             )
-        if stylespace_name_to_tag[name] != tag:
-            raise Error(
-                f"Font axis named '{name}' has tag '{tag}' but Stylespace defines it "
-                f"to be '{stylespace_name_to_tag[name]}'. Axis names and tags must "
-                "match between the font and the Stylespace."
+        elif stylespace_name_to_tag[name] != tag:
+            issues.append(
+                Issue(
+                    "axis_tag_mismatch",
+                    f"Font axis named '{name}' has tag '{tag}' but Stylespace defines "
+                    f"it to be '{stylespace_name_to_tag[name]}'. Axis names and tags "
+                    "must match between the font and the Stylespace.",
+                    name,
+                )
             )
 
     # Sanity check: Only allow axis names in additional_locations that aren't in the
     # font already.
     for axis_name in additional_locations:
         if axis_name in font_name_to_tag:
-            raise Error(
-                f"Rejecting the additional location for the axis named '{axis_name}' "
-                "because it is already present in the font."
+            issues.append(
+                Issue(
+                    "redundant_additional_location",
+                    "Rejecting the additional location for the axis named "
+                    f"'{axis_name}' because it is already present in the font.",
+                    axis_name,
+                    additional_locations[axis_name],
+                )
             )
 
     # Sanity check: Ensure the location of the font is fully specified. This means
     # the font axis names plus additional_locations axis names must equal Stylespace
     # axis names.
-    font_names_set = set(font_name_to_tag.keys()).union(additional_names_set)
-    if font_names_set != stylespace_names_set:
-        missing_axis_names = ", ".join(stylespace_names_set - font_names_set)
-        raise Error(
-            "The location of the font is not fully specified, missing locations "
-            f"for the following axes: {missing_axis_names}."
-        )
+    for axis_name in stylespace_name_to_tag:
+        if axis_name not in font_name_to_tag and axis_name not in additional_locations:
+            issues.append(
+                Issue(
+                    "unspecified_axis",
+                    "The location of the font is not fully specified, missing a "
+                    f"location for the axis named '{axis_name}'.",
+                    axis_name,
+                )
+            )
 
     # Sanity check: only allow raw fallback name IDs that are in this font.
     if isinstance(stylespace.elided_fallback_name_id, int):
-        _default_name_string(varfont, stylespace.elided_fallback_name_id)
+        try:
+            _default_name_string(
+                varfont, stylespace.elided_fallback_name_id, name_index
+            )
+        except Error as e:
+            issues.append(Issue("missing_name", str(e)))
+
+    return issues
+
+
+def _axis_stops(
+    varfont: fontTools.ttLib.TTFont,
+    additional_locations: Mapping[str, float],
+    name_to_tag: Mapping[str, str],
+    stylespace_stops: Mapping[str, AbstractSet[float]],
+    name_index: Optional[statmake.names.NameTableIndex],
+    issues: List[Issue],
+) -> Mapping[str, Set[float]]:
+    """Return the stops used on each axis, by axis tag, and append an issue for
+    every stop that has no Stylespace entry.
+
+    The STAT table must contain a name for each stop that is used on each axis, so
+    each stop must have an entry in the Stylespace. Also include locations in
+    additional_locations that can refer to axes not present in the current varfont.
+    Axes that `_sanity_check` reported problems for are skipped.
+    """
+    axis_stops: Dict[str, Set[float]] = collections.defaultdict(set)  # tag to stops
+    instance_stops = _instance_stops(varfont["fvar"], stylespace_stops)
+    if instance_stops is not None:
+        axis_stops.update(instance_stops)
+    else:
+        tag_to_name = {tag: name for name, tag in name_to_tag.items()}
+        missing: Set[Tuple[str, float]] = set()
+        for instance in varfont["fvar"].instances:
+            for k, v in instance.coordinates.items():
+                if k not in stylespace_stops:
+                    continue
+                if v not in stylespace_stops[k] and (k, v) not in missing:
+                    missing.add((k, v))
+                    issues.append(
+                        Issue(
+                            "missing_stop",
+                            f"There is no Stylespace entry for stop {v} on the '{k}' "
+                            "axis.",
+                            tag_to_name[k],
+                            v,
+                            _instance_name(
+                                varfont, instance.subfamilyNameID, name_index
+                            ),
+                        )
+                    )
+                axis_stops[k].add(v)
+
+    for k, v in additional_locations.items():
+        if k not in name_to_tag:
+            continue
+        axis_tag = name_to_tag[k]
+        if v not in stylespace_stops[axis_tag]:
+            issues.append(
+                Issue(
+                    "missing_stop",
+                    f"There is no Stylespace entry for stop {v} on the '{k}' axis "
+                    "(from additional locations).",
+                    k,
+                    v,
+                )
+            )
+        axis_stops[axis_tag].add(v)
+    return axis_stops
+
+
+def _instance_stops(
+    fvar: Any, stylespace_stops: Mapping[str, AbstractSet[float]]
+) -> Optional[Dict[str, Set[float]]]:
+    """Return the stops the named instances use on each axis, by axis tag.
+
+    Works on a whole axis at a time: a set comprehension collects the axis' stops
+    and a single subset test checks them against the Stylespace, which is about
+    twice as fast as checking every coordinate of every instance on its own.
+
+    Returns None if there is anything to report, i.e. an axis the Stylespace does
+    not have or a stop without a Stylespace entry, so that the caller can fall back
+    to the loop that reports the issues.
+    """
+    axis_stops = {}
+    for axis in fvar.axes:
+        tag = axis.axisTag
+        if tag not in stylespace_stops:
+            return None
+        try:
+            stops = {instance.coordinates[tag] for instance in fvar.instances}
+        except KeyError:
+            return None
+        if not stops <= stylespace_stops[tag]:
+            return None
+        axis_stops[tag] = stops
+    return axis_stops
+
+
+def _instance_name(
+    varfont: fontTools.ttLib.TTFont,
+    name_id: int,
+    name_index: Optional[statmake.names.NameTableIndex],
+) -> str:
+    try:
+        return _default_name_string(varfont, name_id, name_index)
+    except (Error, KeyError):
+        return f"name ID {name_id}"
+
 
+def _resolve_names(
+    name_index: statmake.names.NameTableIndex,
+    axes: List[Mapping[str, Any]],
+    locations: List[Mapping[str, Any]],
+    elided_fallback_name: Union[int, Dict[str, str]],
+    mac_names: bool,
+) -> Tuple[List[Mapping[str, Any]], List[Mapping[str, Any]], int]:
+    """Add the names of the builder data to the name table through the index and
+    return copies of the builder data with name IDs in place of the names.
 
-def _default_name_string(otfont: fontTools.ttLib.TTFont, name_id: int) -> str:
+    buildStatTable would add the names itself, but with a scan of the name table
+    for every name. Names are added in the same order buildStatTable adds them, so
+    the resulting name IDs are the same.
+    """
+
+    def add_name(name: Union[int, str, Mapping[str, str]], min_name_id: int) -> int:
+        if isinstance(name, int):
+            return name
+        if isinstance(name, str):
+            name = {"en": name}
+        return name_index.add_multilingual_name(
+            name, windows=True, mac=mac_names, min_name_id=min_name_id
+        )
+
+    elided_fallback_name_id = add_name(elided_fallback_name, 0)
+    resolved_axes: List[Mapping[str, Any]] = []
+    for axis in axes:
+        axis_name_id = add_name(axis["name"], 256)
+        resolved_axes.append(
+            {
+                **axis,
+                "name": axis_name_id,
+                "values": [
+                    {**value, "name": add_name(value["name"], 0)}
+                    for value in axis.get("values", ())
+                ],
+            }
+        )
+    resolved_locations: List[Mapping[str, Any]] = [
+        {**location, "name": add_name(location["name"], 0)} for location in locations
+    ]
+    return resolved_axes, resolved_locations, elided_fallback_name_id
+
+
+# The tables apply_stylespace_to_variable_font can change. Mac names in languages
+# without a Mac language code are stored as language tags in ltag.
+_PATCHED_TABLES = ("fvar", "STAT", "name", "ltag")
+
+
+def _compile_tables(
+    otfont: fontTools.ttLib.TTFont, tags: Tuple[str, ...]
+) -> Tuple[Optional[bytes], ...]:
+    """Return the compiled data of the tables, None for tables that are missing."""
+    return tuple(otfont[tag].compile(otfont) if tag in otfont else None for tag in tags)
+
+
+def _table_data(
+    otfont: fontTools.ttLib.TTFont, tags: Tuple[str, ...]
+) -> Tuple[Optional[bytes], ...]:
+    """Return the data of the tables, None for tables that are missing.
+
+    Unlike `_compile_tables`, tables that are not loaded are not decompiled, their
+    data is returned as it is in the font file.
+    """
+    return tuple(otfont.getTableData(tag) if tag in otfont else None for tag in tags)
+
+
+def _replace_tables(
+    otfont: fontTools.ttLib.TTFont,
+    tags: Tuple[str, ...],
+    tables: Tuple[Optional[bytes], ...],
+) -> None:
+    """Replace the tables with ones decompiled from the data, removing those that
+    are None."""
+    for tag, data in zip(tags, tables):
+        if data is None:
+            if tag in otfont:
+                del otfont[tag]
+            continue
+        table = fontTools.ttLib.newTable(tag)
+        table.decompile(data, otfont)
+        otfont[tag] = table
+
+
+def _result_cache_key(
+    stylespace_fingerprint: str,
+    varfont: fontTools.ttLib.TTFont,
+    data_before: Tuple[Optional[bytes], ...],
+    additional_locations: Mapping[str, float],
+    mac_names: bool,
+    compact_names: bool,
+) -> str:
+    """Return the `ResultCache` key of everything the patched tables depend on.
+
+    Besides the Stylespace and the options, these are the fvar and name tables, the
+    ltag table that Mac names may add languages to and, when compacting the name
+    table, the name IDs that other tables use.
+    """
+    tables = dict(zip(_PATCHED_TABLES, data_before))
+    other_name_ids = (
+        sorted(statmake.names._other_referenced_name_ids(varfont))
+        if compact_names
+        else []
+    )
+    parts = [
+        stylespace_fingerprint.encode("ascii"),
+        tables["fvar"] or b"",
+        tables["name"] or b"",
+        tables["ltag"] or b"",
+        repr(
+            sorted((name, float(value)) for name, value in additional_locations.items())
+        ).encode("utf-8"),
+        repr((mac_names, compact_names, other_name_ids)).encode("ascii"),
+        fontTools.version.encode("ascii"),  # type: ignore
+    ]
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return statmake.cache.content_key(digest.digest())
+
+
+def _default_name_string(
+    otfont: fontTools.ttLib.TTFont,
+    name_id: int,
+    name_index: Optional[statmake.names.NameTableIndex] = None,
+) -> str:
     """Return English name for name_id."""
-    name = otfont["name"].getName(name_id, 3, 1, 0x409)
+    if name_index is not None:
+        name = name_index.get_name(name_id, 3, 1, 0x409)
+    else:
+        name = otfont["name"].getName(name_id, 3, 1, 0x409)
     if name is None:
         raise Error(f"No English record for id {name_id} for Windows platform.")
     return name.toStr()
@@ -0,0 +1,254 @@
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+import fontTools.ttLib
+import fontTools.ttLib.tables._n_a_m_e
+
+
+class NameTableIndex:
+    """An index over the records of a font's `name` table.
+
+    Looking up a record with `name.getName` or finding a reusable name ID with
+    `name.addMultilingualName` scans the whole table every time, which gets
+    quadratic when adding thousands of names. The index is built once per font and
+    keyed by (platformID, platEncID, langID, nameID) and by decoded string.
+
+    All changes to the name table must go through the index while it is in use.
+    """
+
+    def __init__(self, otfont: fontTools.ttLib.TTFont) -> None:
+        self.otfont = otfont
+        self.table = otfont["name"]
+        self._records: Dict[
+            Tuple[int, int, int, int], fontTools.ttLib.tables._n_a_m_e.NameRecord
+        ] = {}
+        self._name_ids_by_string: Dict[Tuple[str, int, int, int], Set[int]] = {}
+        self._max_name_id = 0
+        for record in self.table.names:
+            self._index(record)
+
+    def get_name(
+        self, name_id: int, platform_id: int, plat_enc_id: int, lang_id: int
+    ) -> Optional[fontTools.ttLib.tables._n_a_m_e.NameRecord]:
+        """Return the record for the given IDs, like `name.getName` does."""
+        return self._records.get((platform_id, plat_enc_id, lang_id, name_id))
+
+    def find_multilingual_name(
+        self,
+        names: Mapping[str, str],
+        windows: bool = True,
+        mac: bool = True,
+        min_name_id: int = 0,
+    ) -> Optional[int]:
+        """Return the lowest name ID that has records for all names, like
+        `name.findMultilingualName` does, or None."""
+        requested = self._requested_records(names, windows, mac)
+        if not requested:
+            return None
+        candidates = set.intersection(
+            *(self._name_ids_by_string.get(key, set()) for key in requested)
+        )
+        return min(
+            (name_id for name_id in candidates if name_id >= min_name_id),
+            default=None,
+        )
+
+    def add_multilingual_name(
+        self,
+        names: Mapping[str, str],
+        windows: bool = True,
+        mac: bool = True,
+        min_name_id: int = 0,
+    ) -> int:
+        """Add a multilingual name unless it exists already and return its name ID.
+
+        Behaves like `name.addMultilingualName`, so that the same name IDs are
+        assigned.
+        """
+        name_id = self.find_multilingual_name(names, windows, mac, min_name_id)
+        if name_id is not None:
+            return name_id
+
+        name_id = max(self._max_name_id, 255) + 1
+        if name_id > 32767:
+            raise ValueError("nameID must be less than 32768")
+        for lang, name in sorted(names.items()):
+            if windows:
+                windows_name = fontTools.ttLib.tables._n_a_m_e._makeWindowsName(
+                    name, name_id, lang
+                )
+                if windows_name is not None:
+                    self._append(windows_name)
+                else:
+                    # Like fontTools, fall back to Mac names for exotic BCP 47
+                    # language tags that have no Windows language code.
+                    mac = True
+            if mac:
+                mac_name = fontTools.ttLib.tables._n_a_m_e._makeMacName(
+                    name, name_id, lang, self.otfont
+                )
+                if mac_name is not None:
+                    self._append(mac_name)
+        return name_id
+
+    def _requested_records(
+        self, names: Mapping[str, str], windows: bool, mac: bool
+    ) -> List[Tuple[str, int, int, int]]:
+        requested: List[Tuple[str, int, int, int]] = []
+        for lang, name in sorted(names.items()):
+            records: List[Optional[fontTools.ttLib.tables._n_a_m_e.NameRecord]] = []
+            if windows:
+                records.append(
+                    fontTools.ttLib.tables._n_a_m_e._makeWindowsName(name, None, lang)
+                )
+            if mac:
+                records.append(
+                    fontTools.ttLib.tables._n_a_m_e._makeMacName(
+                        name, None, lang, self.otfont
+                    )
+                )
+            requested.extend(
+                (record.string, record.platformID, record.platEncID, record.langID)
+                for record in records
+                if record is not None
+            )
+        return requested
+
+    def _append(self, record: fontTools.ttLib.tables._n_a_m_e.NameRecord) -> None:
+        self.table.names.append(record)
+        self._index(record)
+
+    def _index(self, record: fontTools.ttLib.tables._n_a_m_e.NameRecord) -> None:
+        key = (record.platformID, record.platEncID, record.langID, record.nameID)
+        self._records.setdefault(key, record)
+        self._max_name_id = max(self._max_name_id, record.nameID)
+        try:
+            string = record.toUnicode()
+        except UnicodeDecodeError:
+            return
+        self._name_ids_by_string.setdefault(
+            (string, record.platformID, record.platEncID, record.langID), set()
+        ).add(record.nameID)
+
+
+def compact_name_table(otfont: fontTools.ttLib.TTFont) -> int:
+    """Share name IDs between identical names and drop unused name records.
+
+    Name IDs from 256 up that have exactly the same records (platform, encoding,
+    language and string) are merged into the lowest of them, and the references in
+    the `fvar` and `STAT` tables are pointed at it. Then all records from name ID 256
+    up that no table references anymore are removed, e.g. the names of axis values
+    that an earlier run of statmake put into the font. Name IDs referenced from the
+    feature parameters in `GSUB` and `GPOS`, from `CPAL` or from `feat` are kept as
+    they are.
+
+    Returns by how many bytes the compiled name table shrank.
+    """
+    if "name" not in otfont:
+        return 0
+    name_table = otfont["name"]
+    size_before = len(name_table.compile(otfont))
+
+    records_by_name_id: Dict[int, Set[Tuple[int, int, int, bytes]]] = {}
+    for record in name_table.names:
+        if record.nameID >= 256:
+            records_by_name_id.setdefault(record.nameID, set()).add(
+                (record.platformID, record.platEncID, record.langID, record.toBytes())
+            )
+    canonical_name_ids: Dict[FrozenSet[Tuple[int, int, int, bytes]], int] = {}
+    for name_id in sorted(records_by_name_id):
+        canonical_name_ids.setdefault(frozenset(records_by_name_id[name_id]), name_id)
+    name_id_map = {
+        name_id: canonical_name_ids[frozenset(records)]
+        for name_id, records in records_by_name_id.items()
+    }
+
+    referenced = _remap_name_ids(otfont, name_id_map)
+    referenced.update(_other_referenced_name_ids(otfont))
+    name_table.names = [
+        record
+        for record in name_table.names
+        if record.nameID < 256 or record.nameID in referenced
+    ]
+    return size_before - len(name_table.compile(otfont))
+
+
+def _remap_name_ids(
+    otfont: fontTools.ttLib.TTFont, name_id_map: Mapping[int, int]
+) -> Set[int]:
+    """Point the name IDs in fvar and STAT to their new values and return all
+    name IDs they reference afterwards."""
+    referenced: Set[int] = set()
+
+    def remap(name_id: int) -> int:
+        name_id = name_id_map.get(name_id, name_id)
+        referenced.add(name_id)
+        return name_id
+
+    if "fvar" in otfont:
+        fvar = otfont["fvar"]
+        for axis in fvar.axes:
+            axis.axisNameID = remap(axis.axisNameID)
+        for instance in fvar.instances:
+            instance.subfamilyNameID = remap(instance.subfamilyNameID)
+            if instance.postscriptNameID != 0xFFFF:
+                instance.postscriptNameID = remap(instance.postscriptNameID)
+    if "STAT" in otfont:
+        stat = otfont["STAT"].table
+        stat.ElidedFallbackNameID = remap(stat.ElidedFallbackNameID)
+        if stat.DesignAxisRecord is not None:
+            for axis_record in stat.DesignAxisRecord.Axis:
+                axis_record.AxisNameID = remap(axis_record.AxisNameID)
+        if stat.AxisValueArray is not None:
+            for axis_value in stat.AxisValueArray.AxisValue:
+                axis_value.ValueNameID = remap(axis_value.ValueNameID)
+    return referenced
+
+
+def _other_referenced_name_ids(otfont: fontTools.ttLib.TTFont) -> Set[int]:
+    referenced: Set[int] = set()
+    for tag in ("GSUB", "GPOS"):
+        if tag not in otfont:
+            continue
+        feature_list = _peek_table(otfont, tag).table.FeatureList
+        for feature_record in feature_list.FeatureRecord if feature_list else ():
+            params = feature_record.Feature.FeatureParams
+            if params is None:
+                continue
+            for attr in (
+                "SubfamilyNameID",
+                "UINameID",
+                "FeatUILabelNameID",
+                "FeatUITooltipTextNameID",
+                "SampleTextNameID",
+            ):
+                if hasattr(params, attr):
+                    referenced.add(getattr(params, attr))
+            if getattr(params, "FirstParamUILabelNameID", 0):
+                referenced.update(
+                    range(
+                        params.FirstParamUILabelNameID,
+                        params.FirstParamUILabelNameID + params.NumNamedParameters,
+                    )
+                )
+    if "CPAL" in otfont:
+        cpal = _peek_table(otfont, "CPAL")
+        if cpal.version == 1:
+            referenced.update(cpal.paletteLabels)
+            referenced.update(cpal.paletteEntryLabels)
+    if "feat" in otfont:
+        for feature_name in _peek_table(otfont, "feat").table.FeatureNames.FeatureName:
+            referenced.add(feature_name.FeatureNameID)
+            settings = getattr(feature_name, "Settings", None)
+            for setting in getattr(settings, "Setting", None) or ():
+                referenced.add(setting.SettingNameID)
+    return referenced
+
+
+def _peek_table(otfont: fontTools.ttLib.TTFont, tag: str) -> Any:
+    """Decompile a table that is only read, without loading it into a lazily loaded
+    font, so that it is not recompiled when the font is saved."""
+    if not otfont.lazy or otfont.isLoaded(tag):
+        return otfont[tag]
+    table = fontTools.ttLib.newTable(tag)
+    table.decompile(otfont.getTableData(tag), otfont)
+    return table
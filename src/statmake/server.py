@@ -0,0 +1,353 @@
+"""A long-running statmake process that applies Stylespaces to fonts on request.
+
+Start it with `statmake serve --socket some.sock` and send jobs with
+`statmake-client` or `statmake.client.Client`. The server keeps fontTools and
+friends imported and keeps the parsed Designspaces and Stylespaces in memory, so
+the cost of a job is mostly the font work itself.
+
+A job is a JSON object on a single line with the keys:
+
+- `font`: The path to the variable font.
+- `designspace`: The path to the Designspace file.
+- `stylespace` (optional): The path to the Stylespace file, if it is not
+  contained in or referenced from the Designspace.
+- `output` (optional): Where to write the font, defaults to in-place.
+- `mac_names` (optional): Whether to add Mac name records.
+- `recompile` (optional): Whether to recompile every table when saving.
+- `compact_names` (optional): Whether to merge identical names and drop unused
+  ones.
+
+Relative paths are resolved against the server's working directory. Each job is
+answered with a line `{"ok": true, "written": ...}` or `{"ok": false, "error":
+...}`. Failed checks add an `issues` list to the latter, with one object per
+problem found, see `statmake.errors.Issue`.
+"""
+
+import argparse
+import collections
+import hashlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+import attrs
+import fontTools.designspaceLib
+import fontTools.ttLib
+
+import statmake.classes
+import statmake.client
+import statmake.lib
+from statmake.errors import Error
+
+T = TypeVar("T")
+
+
+@attrs.define
+class _CacheEntry(Generic[T]):
+    mtime_ns: int
+    size: int
+    digest: bytes
+    value: T
+
+
+class FileCache(Generic[T]):
+    """Parsed files, keyed by their resolved path.
+
+    An entry is reused as long as the file's modification time and size are
+    unchanged. Otherwise the file is read again and only parsed if its content hash
+    changed, too. Only max_entries files are kept, the least recently used ones are
+    dropped first.
+
+    Files are read and parsed outside of the lock that guards the entries, so a slow
+    parse only holds up other lookups of the same file.
+    """
+
+    def __init__(
+        self, parse: Callable[[Path, bytes], T], max_entries: int = 64
+    ) -> None:
+        self._parse = parse
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[Path, _CacheEntry[T]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Serializes reading and parsing each file, so it is only parsed once.
+        self._path_locks: Dict[Path, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> T:
+        path = path.resolve()
+        stat = path.stat()
+        with self._lock:
+            value = self._fresh_value(path, stat)
+            if value is not None:
+                return value[0]
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+
+        with path_lock:
+            with self._lock:
+                # Another thread may have parsed the file in the meantime.
+                value = self._fresh_value(path, stat)
+                if value is not None:
+                    return value[0]
+                entry = self._entries.get(path)
+
+            data = path.read_bytes()
+            digest = hashlib.sha256(data).digest()
+            if entry is not None and entry.digest == digest:
+                with self._lock:
+                    self.hits += 1
+                    entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                return entry.value
+
+            with self._lock:
+                self.misses += 1
+            try:
+                parsed = self._parse(path, data)
+            except BaseException:
+                with self._lock:
+                    if path not in self._entries:
+                        self._path_locks.pop(path, None)
+                raise
+            with self._lock:
+                self._entries[path] = _CacheEntry(
+                    stat.st_mtime_ns, stat.st_size, digest, parsed
+                )
+                self._entries.move_to_end(path)
+                while len(self._entries) > self.max_entries:
+                    evicted_path, _ = self._entries.popitem(last=False)
+                    self._path_locks.pop(evicted_path, None)
+            return parsed
+
+    def _fresh_value(self, path: Path, stat: os.stat_result) -> Optional[Tuple[T]]:
+        """Return the value of the entry for path in a tuple if the file is
+        unchanged, and count the hit. Must be called with the lock held."""
+        entry = self._entries.get(path)
+        if entry is None or (entry.mtime_ns, entry.size) != (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return None
+        self.hits += 1
+        self._entries.move_to_end(path)
+        return (entry.value,)
+
+
+@attrs.frozen
+class Job:
+    font: Path
+    designspace: Path
+    stylespace: Optional[Path] = None
+    output: Optional[Path] = None
+    mac_names: bool = False
+    recompile: bool = False
+    compact_names: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Job":
+        if not isinstance(data, Mapping):
+            raise TypeError("A job must be a JSON object.")
+        unknown_keys = set(data) - {field.name for field in attrs.fields(cls)}
+        if unknown_keys:
+            raise ValueError(f"Unknown job keys: {', '.join(sorted(unknown_keys))}.")
+        for key in ("font", "designspace"):
+            if not isinstance(data.get(key), str):
+                raise TypeError(f"A job must contain a '{key}' path.")
+        for key in ("stylespace", "output"):
+            if not isinstance(data.get(key, ""), str):
+                raise TypeError(f"The job's '{key}' must be a path.")
+        for key in ("mac_names", "recompile", "compact_names"):
+            if not isinstance(data.get(key, False), bool):
+                raise TypeError(f"The job's '{key}' must be true or false.")
+        return cls(
+            font=Path(data["font"]),
+            designspace=Path(data["designspace"]),
+            stylespace=Path(data["stylespace"]) if data.get("stylespace") else None,
+            output=Path(data["output"]) if data.get("output") else None,
+            mac_names=data.get("mac_names", False),
+            recompile=data.get("recompile", False),
+            compact_names=data.get("compact_names", False),
+        )
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves jobs over a Unix domain socket, one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: os.PathLike) -> None:
+        self.designspaces: FileCache[fontTools.designspaceLib.DesignSpaceDocument] = (
+            FileCache(_parse_designspace)
+        )
+        self.stylespaces: FileCache[statmake.lib.StylespaceIndex] = FileCache(
+            lambda _, data: statmake.lib.StylespaceIndex.from_stylespace(
+                statmake.classes.Stylespace.from_bytes(data)
+            )
+        )
+        # Stylespaces stored inline in a Designspace live as long as its document.
+        self._inline_stylespaces: weakref.WeakKeyDictionary[
+            fontTools.designspaceLib.DesignSpaceDocument, statmake.lib.StylespaceIndex
+        ] = weakref.WeakKeyDictionary()
+        self._inline_stylespaces_lock = threading.Lock()
+        super().__init__(os.fspath(socket_path), _Handler)
+
+    def process(self, request: Any) -> Dict[str, Any]:
+        """Run a job and return the response to send back."""
+        try:
+            written = self.run_job(Job.from_dict(request))
+        except Error as e:
+            response: Dict[str, Any] = {"ok": False, "error": str(e)}
+            if e.issues:
+                response["issues"] = [issue._asdict() for issue in e.issues]
+            return response
+        except (OSError, TypeError, ValueError, fontTools.ttLib.TTLibError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            # E.g. malformed XML. Keep serving the other jobs.
+            logging.exception("Unexpected error while running job %r", request)
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return {"ok": True, "written": written}
+
+    def run_job(self, job: Job) -> bool:
+        """Apply the job's Stylespace to its font and return whether the font was
+        written."""
+        designspace = self.designspaces.get(job.designspace)
+        if job.stylespace is not None:
+            stylespace_index = self.stylespaces.get(job.stylespace)
+        else:
+            stylespace_index = self._designspace_stylespace(designspace)
+        return statmake.lib.apply_stylespace_to_font_file(
+            stylespace_index.stylespace,
+            job.font,
+            job.output,
+            designspace.lib.get("org.statmake.additionalLocations", {}),
+            mac_names=job.mac_names,
+            recompile=job.recompile,
+            stylespace_index=stylespace_index,
+            compact_names=job.compact_names,
+        )
+
+    def _designspace_stylespace(
+        self, designspace: fontTools.designspaceLib.DesignSpaceDocument
+    ) -> statmake.lib.StylespaceIndex:
+        stylespace_inline = designspace.lib.get(
+            statmake.classes.DESIGNSPACE_STYLESPACE_INLINE_KEY
+        )
+        stylespace_path = designspace.lib.get(
+            statmake.classes.DESIGNSPACE_STYLESPACE_PATH_KEY
+        )
+        if stylespace_path and not stylespace_inline and designspace.path:
+            return self.stylespaces.get(Path(designspace.path).parent / stylespace_path)
+
+        with self._inline_stylespaces_lock:
+            stylespace_index = self._inline_stylespaces.get(designspace)
+            if stylespace_index is None:
+                # Raises the appropriate errors for missing or conflicting keys.
+                stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(
+                    statmake.classes.Stylespace.from_designspace(designspace)
+                )
+                self._inline_stylespaces[designspace] = stylespace_index
+            return stylespace_index
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: Server
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response: Dict[str, Any] = {"ok": False, "error": f"Bad JSON: {e}"}
+            else:
+                response = self.server.process(request)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def _socket_in_use(socket_path: Path) -> bool:
+    """Return whether a server is listening on the Unix socket at socket_path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(os.fspath(socket_path))
+        except ConnectionRefusedError:
+            return False
+    return True
+
+
+def _parse_designspace(
+    path: Path, data: bytes
+) -> fontTools.designspaceLib.DesignSpaceDocument:
+    """Parse the Designspace data read from path, like `DesignSpaceDocument.fromfile`
+    does, so that the paths in it resolve relative to path."""
+    document = fontTools.designspaceLib.DesignSpaceDocument()
+    document.path = os.fspath(path)
+    document.filename = path.name
+    reader = document.readerClass(io.BytesIO(data), document)
+    reader.path = document.path
+    reader.read()
+    if document.sources:
+        document.findDefault()
+    return document
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+
+    parser = argparse.ArgumentParser(
+        prog="statmake serve",
+        description=(
+            "Keep running and apply Stylespaces to fonts on request, see "
+            "statmake-client."
+        ),
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=os.environ.get(statmake.client.SOCKET_ENV),
+        help=(
+            "The path of the Unix socket to listen on. Can also be set with the "
+            f"{statmake.client.SOCKET_ENV} environment variable."
+        ),
+    )
+    parsed_args = parser.parse_args(args)
+    if parsed_args.socket is None:
+        parser.error(
+            f"Pass --socket or set the {statmake.client.SOCKET_ENV} environment "
+            "variable."
+        )
+    if parsed_args.socket.is_socket():
+        if _socket_in_use(parsed_args.socket):
+            logging.error(
+                "Another server is already listening on '%s'.", parsed_args.socket
+            )
+            sys.exit(1)
+        parsed_args.socket.unlink()  # Left behind by a previous server.
+    with Server(parsed_args.socket) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            parsed_args.socket.unlink()
@@ -0,0 +1,85 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import fontTools.ttLib
+import pytest
+
+import statmake.aio
+import statmake.classes
+import statmake.lib
+
+from . import testutil
+
+
+def test_apply_concurrently(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    font_paths = [tmp_path / f"varfont{index}.ttf" for index in range(4)]
+    for font_path in font_paths:
+        varfont.save(font_path)
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(stylespace)
+
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+    apply_stylespace_to_font_file = statmake.lib.apply_stylespace_to_font_file
+
+    def counting_apply(*args, **kwargs):
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        try:
+            return apply_stylespace_to_font_file(*args, **kwargs)
+        finally:
+            with lock:
+                running -= 1
+
+    async def main():
+        semaphore = asyncio.Semaphore(2)
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            return await asyncio.gather(
+                *(
+                    statmake.aio.apply(
+                        stylespace,
+                        font_path,
+                        additional_locations={"Italic": 0},
+                        stylespace_index=stylespace_index,
+                        executor=executor,
+                        semaphore=semaphore,
+                    )
+                    for font_path in font_paths
+                )
+            )
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            statmake.lib, "apply_stylespace_to_font_file", counting_apply
+        )
+        assert asyncio.run(main()) == [True] * 4
+    assert 1 <= max_running <= 2
+
+    for font_path in font_paths:
+        font = fontTools.ttLib.TTFont(font_path)
+        v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+        assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+def test_apply_output_path_and_errors(datadir, tmp_path):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    original_data = (tmp_path / "varfont.ttf").read_bytes()
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+
+    assert asyncio.run(
+        statmake.aio.apply(
+            stylespace, tmp_path / "varfont.ttf", tmp_path / "out.ttf", {"Italic": 0}
+        )
+    )
+    assert (tmp_path / "varfont.ttf").read_bytes() == original_data
+    assert (tmp_path / "out.ttf").exists()
+
+    with pytest.raises(OSError):
+        asyncio.run(statmake.aio.apply(stylespace, tmp_path / "missing.ttf"))
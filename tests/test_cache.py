@@ -0,0 +1,278 @@
+import gc
+import io
+import logging
+import os
+import pickle
+
+import fontTools.misc.plistlib
+import fontTools.otlLib.builder
+import fontTools.ttLib
+import pytest
+
+import statmake.cache
+import statmake.cli
+import statmake.lib
+from statmake.classes import Stylespace
+
+from . import testutil
+
+
+def test_stylespace_cache_hit(datadir, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace", cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.stylespace.pickle"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("A cache hit must not parse the Stylespace again.")
+
+    monkeypatch.setattr(fontTools.misc.plistlib, "loads", fail)
+    monkeypatch.setattr(Stylespace, "_validate", fail)
+    stylespace_cached = Stylespace.from_file(
+        datadir / "Test.stylespace", cache_dir=cache_dir
+    )
+    assert stylespace_cached == stylespace
+
+
+def test_stylespace_cache_key_changes_with_content(datadir, tmp_path):
+    cache_dir = tmp_path / "cache"
+    stylespace_path = tmp_path / "Test.stylespace"
+    stylespace_path.write_bytes((datadir / "Test.stylespace").read_bytes())
+    Stylespace.from_file(stylespace_path, cache_dir=cache_dir)
+
+    stylespace_path.write_bytes((datadir / "TestJustWght.stylespace").read_bytes())
+    stylespace = Stylespace.from_file(stylespace_path, cache_dir=cache_dir)
+    assert stylespace == Stylespace.from_file(datadir / "TestJustWght.stylespace")
+    assert len(list(cache_dir.glob("*.stylespace.pickle"))) == 2
+
+
+def test_stylespace_cache_corrupt_entry(datadir, tmp_path):
+    cache_dir = tmp_path / "cache"
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace", cache_dir=cache_dir)
+    (entry,) = cache_dir.glob("*.stylespace.pickle")
+    entry.write_bytes(b"garbage")
+
+    assert stylespace == Stylespace.from_file(
+        datadir / "Test.stylespace", cache_dir=cache_dir
+    )
+    assert pickle.loads(entry.read_bytes()) == stylespace
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = statmake.cache.DiskCache(tmp_path, ".entry", max_size=25)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    os.utime(tmp_path / "a.entry", ns=(0, 0))
+    os.utime(tmp_path / "b.entry", ns=(1, 1))
+    assert cache.get("a") == b"a" * 10  # Marks "a" as recently used.
+
+    cache.put("c", b"c" * 10)
+    assert cache.get("a") == b"a" * 10
+    assert cache.get("b") is None
+    assert cache.get("c") == b"c" * 10
+
+
+@pytest.mark.parametrize("use_env", [False, True])
+def test_cli_cache_dir(datadir, tmp_path, monkeypatch, use_env):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont.ttf")
+    cache_dir = tmp_path / "cache"
+
+    args = [
+        "-m",
+        str(datadir / "TestExternalStylespace.designspace"),
+        str(tmp_path / "varfont.ttf"),
+    ]
+    if use_env:
+        monkeypatch.setenv(statmake.cache.CACHE_DIR_ENV, str(cache_dir))
+    else:
+        args = ["--cache-dir", str(cache_dir), *args]
+    statmake.cli.main(args)
+
+    assert len(list(cache_dir.glob("*.stylespace.pickle"))) == 1
+    font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+def test_result_cache(datadir, tmp_path, monkeypatch):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    result_cache = statmake.lib.ResultCache(tmp_path / "cache")
+
+    output = statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, {"Italic": 0}, mac_names=True, result_cache=result_cache
+    )
+    assert (result_cache.hits, result_cache.misses) == (0, 1)
+    assert len(list((tmp_path / "cache").glob("*.tables.pickle"))) == 1
+
+    # A font with different outlines but the same fvar and name tables.
+    font = fontTools.ttLib.TTFont(io.BytesIO(data))
+    font["head"].fontRevision = 2.0
+    font.save(tmp_path / "varfont2.ttf")
+    expected = statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace,
+        (tmp_path / "varfont2.ttf").read_bytes(),
+        {"Italic": 0},
+        mac_names=True,
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("A cache hit must not build the tables again.")
+
+    with monkeypatch.context() as m:
+        m.setattr(statmake.lib, "_generate_builder_data", fail)
+        m.setattr(fontTools.otlLib.builder, "buildStatTable", fail)
+        recorder = statmake.lib.PhaseRecorder()
+        assert statmake.lib.apply_stylespace_to_font_file(
+            stylespace,
+            tmp_path / "varfont2.ttf",
+            additional_locations={"Italic": 0},
+            mac_names=True,
+            instrumentation=recorder,
+            result_cache=result_cache,
+        )
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+    assert (tmp_path / "varfont2.ttf").read_bytes() == expected
+    counts = {phase["name"]: phase["counts"] for phase in recorder.phases}
+    assert counts["result_cache_lookup"] == {"hit": 1}
+
+    # Applying it again changes nothing.
+    assert not statmake.lib.apply_stylespace_to_font_file(
+        stylespace,
+        tmp_path / "varfont2.ttf",
+        additional_locations={"Italic": 0},
+        mac_names=True,
+        result_cache=result_cache,
+    )
+    assert (result_cache.hits, result_cache.misses) == (1, 2)
+
+    # Different options are cached separately.
+    for kwargs in (
+        {"additional_locations": {"Italic": 1}, "mac_names": True},
+        {"additional_locations": {"Italic": 0}},
+    ):
+        statmake.lib.apply_stylespace_to_font_bytes(
+            stylespace, data, result_cache=result_cache, **kwargs
+        )
+    assert (result_cache.hits, result_cache.misses) == (1, 4)
+    assert output == statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, {"Italic": 0}, mac_names=True, result_cache=result_cache
+    )
+    assert (result_cache.hits, result_cache.misses) == (2, 4)
+
+
+def test_result_cache_corrupt_entry(datadir, tmp_path):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    result_cache = statmake.lib.ResultCache(tmp_path / "cache")
+    output = statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, {"Italic": 0}, result_cache=result_cache
+    )
+    (entry,) = (tmp_path / "cache").glob("*.tables.pickle")
+    entry.write_bytes(pickle.dumps(("not", "tables")))
+
+    assert output == statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, {"Italic": 0}, result_cache=result_cache
+    )
+    assert (result_cache.hits, result_cache.misses) == (0, 2)
+
+    # Neither the counts nor the fingerprints computed so far are pickled.
+    result_cache_copy = pickle.loads(pickle.dumps(result_cache))
+    assert (result_cache_copy.hits, result_cache_copy.misses) == (0, 0)
+    assert not result_cache_copy._fingerprints
+
+
+def test_result_cache_fingerprints_are_dropped(datadir, tmp_path):
+    result_cache = statmake.lib.ResultCache(tmp_path / "cache")
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    fingerprint = result_cache.fingerprint(stylespace)
+    assert fingerprint == stylespace.fingerprint()
+    assert result_cache.fingerprint(stylespace) == fingerprint
+    assert len(result_cache._fingerprints) == 1
+
+    del stylespace
+    gc.collect()
+    assert not result_cache._fingerprints
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_result_cache(datadir, tmp_path, caplog, jobs):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    (tmp_path / "out").mkdir()
+    args = [
+        "--cache-dir",
+        str(tmp_path / "cache"),
+        "--jobs",
+        jobs,
+        "--output-dir",
+        str(tmp_path / "out"),
+        "-m",
+        str(datadir / "TestExternalStylespace.designspace"),
+    ]
+    statmake.cli.main([*args, str(tmp_path / "varfont.ttf")])
+    expected = (tmp_path / "out" / "varfont.ttf").read_bytes()
+    assert len(list((tmp_path / "cache").glob("*.tables.pickle"))) == 1
+
+    for name in ("a.ttf", "b.ttf"):
+        (tmp_path / name).write_bytes(data)
+    with caplog.at_level(logging.INFO):
+        statmake.cli.main([*args, str(tmp_path / "a.ttf"), str(tmp_path / "b.ttf")])
+    assert (tmp_path / "out" / "a.ttf").read_bytes() == expected
+    assert (tmp_path / "out" / "b.ttf").read_bytes() == expected
+    if jobs == "1":
+        assert "Reused the cached tables for" in caplog.text
+
+
+def test_result_cache_ltag(datadir, tmp_path):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    # Bosnian has no Mac language code, so Mac names need an ltag table.
+    stylespace = Stylespace.from_dict(
+        _add_language(Stylespace.from_file(datadir / "Test.stylespace").to_dict(), "bs")
+    )
+    result_cache = statmake.lib.ResultCache(tmp_path / "cache")
+
+    outputs = [
+        statmake.lib.apply_stylespace_to_font_bytes(
+            stylespace, data, {"Italic": 0}, mac_names=True, result_cache=result_cache
+        )
+        for _ in range(2)
+    ]
+    assert (result_cache.hits, result_cache.misses) == (1, 1)
+    assert outputs[0] == outputs[1]
+    assert "ltag" in fontTools.ttLib.TTFont(io.BytesIO(outputs[1]))
+
+
+def _add_language(data, language):
+    if isinstance(data, dict):
+        if isinstance(data.get("en"), str):
+            return {**data, language: f"{data['en']} ({language})"}
+        return {key: _add_language(value, language) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_add_language(value, language) for value in data]
+    return data
+
+
+def test_cache_dir_not_writable(datadir, tmp_path, caplog):
+    (tmp_path / "file").write_bytes(b"")
+    cache_dir = tmp_path / "file" / "cache"
+
+    cache = statmake.cache.DiskCache(cache_dir, ".entry")
+    cache.put("a", b"a")
+    assert cache.get("a") is None
+    assert "Could not write to the cache" in caplog.text
+
+    assert Stylespace.from_file(
+        datadir / "Test.stylespace", cache_dir=cache_dir
+    ) == Stylespace.from_file(datadir / "Test.stylespace")
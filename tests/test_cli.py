@@ -1,7 +1,15 @@
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import shutil
+import sys
+
 import fontTools.designspaceLib
 import fontTools.ttLib
 import pytest
-import ufo2ft
 
 import statmake.cli
 
@@ -9,7 +17,7 @@ from . import testutil
 
 
 def test_cli_stylespace_in_designspace(datadir, tmp_path):
-    varfont = empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
     varfont.save(tmp_path / "varfont.ttf")
     del varfont
 
@@ -23,14 +31,14 @@ def test_cli_stylespace_in_designspace(datadir, tmp_path):
 
     font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
     v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
-    assert v == TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
 
     names = font["name"]
     assert not any(True for record in names.names if record.platformID == 1)
 
 
 def test_cli_stylespace_in_designspace_mac_names(datadir, tmp_path):
-    varfont = empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
     varfont.save(tmp_path / "varfont.ttf")
     del varfont
 
@@ -49,7 +57,7 @@ def test_cli_stylespace_in_designspace_mac_names(datadir, tmp_path):
 
 
 def test_cli_designspace_stylespace_external(datadir, tmp_path):
-    varfont = empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
     varfont.save(tmp_path / "varfont.ttf")
 
     statmake.cli.main(
@@ -62,11 +70,11 @@ def test_cli_designspace_stylespace_external(datadir, tmp_path):
 
     font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
     v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
-    assert v == TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
 
 
 def test_cli_stylespace_external(datadir, tmp_path):
-    varfont = empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
     varfont.save(tmp_path / "varfont.ttf")
 
     statmake.cli.main(
@@ -81,7 +89,7 @@ def test_cli_stylespace_external(datadir, tmp_path):
 
     font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
     v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
-    assert v == TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
 
 
 def test_cli_stylespace_in_broken_designspace(datadir, tmp_path):
@@ -95,51 +103,387 @@ def test_cli_stylespace_in_broken_designspace(datadir, tmp_path):
         )
 
 
-def empty_varfont(designspace_path):
-    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
-        designspace_path
+def test_cli_multiple_fonts(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont1.ttf")
+    varfont.save(tmp_path / "varfont2.ttf")
+    original_data = (tmp_path / "varfont1.ttf").read_bytes()
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    statmake.cli.main(
+        [
+            "-m",
+            str(datadir / "TestExternalStylespace.designspace"),
+            "--jobs",
+            "2",
+            "--output-dir",
+            str(output_dir),
+            str(tmp_path / "varfont1.ttf"),
+            str(tmp_path / "varfont2.ttf"),
+        ]
+    )
+
+    for font_name in ("varfont1.ttf", "varfont2.ttf"):
+        font = fontTools.ttLib.TTFont(output_dir / font_name)
+        v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+        assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+        assert (tmp_path / font_name).read_bytes() == original_data
+
+
+def test_cli_multiple_fonts_collects_errors(datadir, tmp_path, caplog):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont.ttf")
+
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "TestExternalStylespace.designspace"),
+                str(tmp_path / "missing1.ttf"),
+                str(tmp_path / "varfont.ttf"),
+                str(tmp_path / "missing2.ttf"),
+            ]
+        )
+
+    # The failures must not stop the other fonts from being processed.
+    font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert "missing1.ttf" in caplog.text
+    assert "missing2.ttf" in caplog.text
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_multiple_fonts_unexpected_errors(datadir, tmp_path, caplog, jobs):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "good.ttf")
+    data = (tmp_path / "good.ttf").read_bytes()
+    # Keep only the table directory, so that reading any table seeks past the end.
+    num_tables = int.from_bytes(data[4:6], "big")
+    (tmp_path / "truncated.ttf").write_bytes(data[: 12 + 16 * num_tables])
+    output_dir = tmp_path / "does" / "not" / "exist"
+
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "TestExternalStylespace.designspace"),
+                "--jobs",
+                jobs,
+                "--output-dir",
+                str(output_dir),
+                str(tmp_path / "truncated.ttf"),
+                str(tmp_path / "good.ttf"),
+            ]
+        )
+
+    font = fontTools.ttLib.TTFont(output_dir / "good.ttf")
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert "Cannot apply Stylespace to font" in caplog.text
+    assert "truncated.ttf': ValueError: seek out of range" in caplog.text
+    assert not (output_dir / "truncated.ttf").exists()
+
+
+@pytest.mark.parametrize(
+    "variable_fonts_designspace",
+    ["TestVariableFonts.designspace", "TestVariableFontsLowercase.designspace"],
+)
+def test_cli_variable_fonts_dir(datadir, tmp_path, variable_fonts_designspace):
+    fonts_dir = tmp_path / "fonts"
+    fonts_dir.mkdir()
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        fonts_dir / "Test-Upright.ttf"
+    )
+    testutil.empty_varfont(datadir / "Test_Wght_Italic.designspace").save(
+        fonts_dir / "Test-Italic.ttf"
+    )
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    statmake.cli.main(
+        [
+            "-m",
+            str(datadir / variable_fonts_designspace),
+            "--variable-fonts-dir",
+            str(fonts_dir),
+            "--output-dir",
+            str(output_dir),
+        ]
     )
-    for source in designspace.sources:
-        source.font = testutil.empty_UFO(source.styleName)
-    ufo2ft.compileInterpolatableTTFsFromDS(designspace, inplace=True)
-    varfont, _, _ = fontTools.varLib.build(designspace)
-    return varfont
-
-
-TEST_WGHT_UPRIGHT_STAT_DUMP = [
-    {"Format": 1, "Name": {"en": "XLight"}, "Flags": 0, "AxisIndex": 0, "Value": 200.0},
-    {"Format": 1, "Name": {"en": "Light"}, "Flags": 0, "AxisIndex": 0, "Value": 300.0},
-    {
-        "Format": 3,
-        "Name": {"en": "Regular"},
-        "Flags": 2,
-        "AxisIndex": 0,
-        "Value": 400.0,
-        "LinkedValue": 700.0,
-    },
-    {
-        "Format": 1,
-        "Name": {"en": "Semi Bold"},
-        "Flags": 0,
-        "AxisIndex": 0,
-        "Value": 600.0,
-    },
-    {"Format": 1, "Name": {"en": "Bold"}, "Flags": 0, "AxisIndex": 0, "Value": 700.0},
-    {
-        "Format": 2,
-        "Name": {"en": "Black"},
-        "Flags": 0,
-        "AxisIndex": 0,
-        "NominalValue": 900.0,
-        "RangeMinValue": 701.0,
-        "RangeMaxValue": 900.0,
-    },
-    {
-        "Format": 3,
-        "Name": {"en": "Upright"},
-        "Flags": 2,
-        "AxisIndex": 1,
-        "Value": 0.0,
-        "LinkedValue": 1.0,
-    },
-]
+
+    # The locations on the Italic axis come from the axis subsets.
+    for font_name, designspace_name in [
+        ("Test-Upright.ttf", "Test_Wght_Upright.designspace"),
+        ("Test-Italic.ttf", "Test_Wght_Italic.designspace"),
+    ]:
+        font = fontTools.ttLib.TTFont(output_dir / font_name)
+        expected = testutil.generate_variable_font(
+            datadir / designspace_name, datadir / "Test.stylespace"
+        )
+        assert testutil.dump_axis_values(
+            font, font["STAT"].table.AxisValueArray.AxisValue
+        ) == testutil.dump_axis_values(
+            expected, expected["STAT"].table.AxisValueArray.AxisValue
+        )
+
+
+def test_cli_variable_fonts_dir_and_fonts(datadir, tmp_path):
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "TestVariableFonts.designspace"),
+                "--variable-fonts-dir",
+                str(tmp_path),
+                str(tmp_path / "varfont.ttf"),
+            ]
+        )
+
+
+def test_cli_missing_designspace(tmp_path, caplog):
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            ["-m", str(tmp_path / "missing.designspace"), str(tmp_path / "a.ttf")]
+        )
+    assert "Could not load Designspace file" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "stylespace_content",
+    [
+        b"<plist><dict>",
+        b"{",
+        b"<plist><dict><key>axes</key><array><dict/></array></dict></plist>",
+        b'{"axes": 1}',
+    ],
+)
+def test_cli_malformed_stylespace(datadir, tmp_path, caplog, stylespace_content):
+    (tmp_path / "bad.stylespace").write_bytes(stylespace_content)
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "Test_Wght_Upright.designspace"),
+                "--stylespace",
+                str(tmp_path / "bad.stylespace"),
+                str(tmp_path / "a.ttf"),
+            ]
+        )
+    assert "Could not load Stylespace file" in caplog.text
+
+
+@pytest.mark.parametrize("stylespace_content", [None, b"<plist><dict>"])
+def test_cli_designspace_with_bad_stylespace_path(
+    datadir, tmp_path, caplog, stylespace_content
+):
+    shutil.copy(datadir / "TestExternalStylespace.designspace", tmp_path)
+    if stylespace_content is not None:
+        (tmp_path / "Test.stylespace").write_bytes(stylespace_content)
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(tmp_path / "TestExternalStylespace.designspace"),
+                str(tmp_path / "a.ttf"),
+            ]
+        )
+    assert "Could not load Stylespace data from Designspace" in caplog.text
+
+
+def test_cli_malformed_designspace(tmp_path, caplog):
+    (tmp_path / "bad.designspace").write_text("<designspace", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            ["-m", str(tmp_path / "bad.designspace"), str(tmp_path / "a.ttf")]
+        )
+    assert "Could not load Designspace file" in caplog.text
+
+
+def test_cli_profile(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont1.ttf")
+    varfont.save(tmp_path / "varfont2.ttf")
+
+    statmake.cli.main(
+        [
+            "-m",
+            str(datadir / "TestExternalStylespace.designspace"),
+            "--profile",
+            str(tmp_path / "profile"),
+            "--jobs",
+            "2",
+            str(tmp_path / "varfont1.ttf"),
+            str(tmp_path / "varfont2.ttf"),
+        ]
+    )
+
+    for font_name in ("varfont1.ttf", "varfont2.ttf"):
+        report = json.loads(
+            (tmp_path / "profile" / f"{font_name}.json").read_text(encoding="utf-8")
+        )
+        assert report["font"] == str(tmp_path / font_name)
+        assert [phase["name"] for phase in report["setup_phases"]] == [
+            "load_designspace",
+            "load_stylespace",
+            "build_stylespace_index",
+        ]
+        phases = {phase["name"]: phase for phase in report["phases"]}
+        assert {"load_font", "sanity_check", "build_stat_table", "save_font"} <= set(
+            phases
+        )
+        assert all(phase["duration"] >= 0 for phase in report["phases"])
+        assert phases["build_stat_table"]["counts"] == {
+            "axes": 2,
+            "axis_values": 7,
+            "format4_locations": 0,
+        }
+
+
+def test_cli_profile_cprofile(datadir, tmp_path):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+
+    statmake.cli.main(
+        [
+            "-m",
+            str(datadir / "TestExternalStylespace.designspace"),
+            "--profile",
+            str(tmp_path / "profile"),
+            "--profile-format",
+            "cprofile",
+            str(tmp_path / "varfont.ttf"),
+        ]
+    )
+
+    stats = pstats.Stats(str(tmp_path / "profile" / "varfont.ttf.prof"))
+    assert any(function_name == "buildStatTable" for _, _, function_name in stats.stats)
+
+
+def test_cli_stdin_stdout(datadir, tmp_path, monkeypatch, capsysbinary):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+
+    statmake.cli.main(["-m", str(datadir / "TestExternalStylespace.designspace"), "-"])
+
+    font = fontTools.ttLib.TTFont(io.BytesIO(capsysbinary.readouterr().out))
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+def test_cli_stdout(datadir, tmp_path, capsysbinary):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    data = (tmp_path / "varfont.ttf").read_bytes()
+
+    statmake.cli.main(
+        [
+            "-m",
+            str(datadir / "TestExternalStylespace.designspace"),
+            "--output-path",
+            "-",
+            str(tmp_path / "varfont.ttf"),
+        ]
+    )
+
+    output = capsysbinary.readouterr().out
+    assert output != data
+    assert (tmp_path / "varfont.ttf").read_bytes() == data
+    font = fontTools.ttLib.TTFont(io.BytesIO(output))
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+@pytest.mark.parametrize(
+    "extra_args", [["-", "varfont.ttf"], ["--output-dir", "out", "-"]]
+)
+def test_cli_stdin_errors(datadir, extra_args):
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            ["-m", str(datadir / "TestExternalStylespace.designspace"), *extra_args]
+        )
+
+
+def test_cli_multiple_fonts_output_path(datadir, tmp_path):
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "TestExternalStylespace.designspace"),
+                "--output-path",
+                str(tmp_path / "out.ttf"),
+                str(tmp_path / "varfont1.ttf"),
+                str(tmp_path / "varfont2.ttf"),
+            ]
+        )
+
+
+def test_cli_skips_unchanged_font(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont.ttf")
+    args = [
+        "-m",
+        str(datadir / "TestExternalStylespace.designspace"),
+        str(tmp_path / "varfont.ttf"),
+    ]
+
+    statmake.cli.main(args)
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    os.utime(tmp_path / "varfont.ttf", ns=(0, 0))
+
+    statmake.cli.main(args)
+    assert (tmp_path / "varfont.ttf").stat().st_mtime_ns == 0
+    assert (tmp_path / "varfont.ttf").read_bytes() == data
+
+    # Writing to a different path always saves the font.
+    statmake.cli.main([*args, "--output-path", str(tmp_path / "out.ttf")])
+    assert (tmp_path / "out.ttf").read_bytes() == data
+
+
+def test_cli_reports_all_issues(datadir, tmp_path, caplog):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Italic.designspace")
+    varfont.save(tmp_path / "varfont.ttf")
+
+    with pytest.raises(SystemExit):
+        statmake.cli.main(
+            [
+                "-m",
+                str(datadir / "Test_Wght_Italic.designspace"),
+                "--stylespace",
+                str(datadir / "TestIncomplete.stylespace"),
+                str(tmp_path / "varfont.ttf"),
+            ]
+        )
+    errors = [r.getMessage() for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) > 1
+    assert all("no Stylespace entry for stop" in error for error in errors)
+
+
+def test_cli_compact_names(datadir, tmp_path, caplog):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont["name"].addMultilingualName({"en": "Orphan"})
+    varfont.save(tmp_path / "varfont.ttf")
+
+    with caplog.at_level(logging.INFO):
+        statmake.cli.main(
+            [
+                "--compact-names",
+                "-m",
+                str(datadir / "Test_Wght_Upright.designspace"),
+                "--stylespace",
+                str(datadir / "Test.stylespace"),
+                str(tmp_path / "varfont.ttf"),
+            ]
+        )
+    [message] = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Compacted the name table")
+    ]
+    assert re.search(r"removed [1-9]\d* records, saved [1-9]\d* bytes", message)
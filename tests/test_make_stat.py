@@ -1,14 +1,19 @@
+import io
+
+import attrs
 import fontTools.designspaceLib
+import fontTools.misc.plistlib
 import pytest
 
 import statmake.classes
+import statmake.lib
 from statmake.errors import Error, StylespaceError
 
 from . import testutil
 
 
 def test_load_stylespace_broken_range(datadir):
-    with pytest.raises(ValueError, match=r"Not enough values .*"):
+    with pytest.raises(StylespaceError, match=r"Not enough values .*"):
         statmake.classes.Stylespace.from_file(datadir / "TestBroken.stylespace")
 
 
@@ -122,7 +127,7 @@ def test_generation_incomplete_additional_location(datadir):
 
 
 def test_generation_disjunct_additional_location(datadir):
-    with pytest.raises(Error, match=r".* the following aren't: Foo."):
+    with pytest.raises(Error, match=r".* in the Stylespace, 'Foo' isn't."):
         _ = testutil.generate_variable_font(
             datadir / "Test_Wght_Italic.designspace",
             datadir / "Test.stylespace",
@@ -165,9 +170,7 @@ def test_generation_wrong_tag(datadir):
 
 
 def test_generation_incomplete_location(datadir):
-    with pytest.raises(
-        Error, match=r"missing locations for the following axes: Italic."
-    ):
+    with pytest.raises(Error, match=r"missing a location for the axis named 'Italic'."):
         _ = testutil.generate_variable_font(
             datadir / "Test_Wght_Italic.designspace", datadir / "Test.stylespace", {}
         )
@@ -552,3 +555,349 @@ def test_generation_full_multilingual(datadir):
     )
 
     assert stat_table.table.ElidedFallbackNameID == 2
+
+
+def test_apply_reports_changes(datadir):
+    varfont = testutil.generate_variable_font(
+        datadir / "Test_WghtItal.designspace", datadir / "Test.stylespace"
+    )
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    assert not statmake.lib.apply_stylespace_to_variable_font(stylespace, varfont, {})
+
+    stylespace = statmake.classes.Stylespace.from_file(
+        datadir / "TestMultilingual.stylespace"
+    )
+    assert statmake.lib.apply_stylespace_to_variable_font(stylespace, varfont, {})
+
+
+def test_load_stylespace_without_validation(datadir):
+    data = fontTools.misc.plistlib.loads(
+        (datadir / "Test.stylespace").read_bytes(), dict_type=dict
+    )
+    stylespace = statmake.classes.Stylespace.from_dict(data, validate=False)
+    assert stylespace == statmake.classes.Stylespace.from_dict(data)
+
+    data = fontTools.misc.plistlib.loads(
+        (datadir / "TestDuplicateValue.stylespace").read_bytes(), dict_type=dict
+    )
+    stylespace = statmake.classes.Stylespace.from_dict(data, validate=False)
+    with pytest.raises(StylespaceError, match=r".* duplicate location value .*"):
+        statmake.classes.Stylespace(**attrs.asdict(stylespace, recurse=False))
+
+
+def test_generation_with_stylespace_index(datadir):
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(stylespace)
+    for designspace_name, additional_locations in [
+        ("Test_WghtItal.designspace", {}),
+        ("Test_Wght_Upright.designspace", {"Italic": 0}),
+        ("Test_Wght_Italic.designspace", {"Italic": 1}),
+    ]:
+        varfont = testutil.generate_variable_font(
+            datadir / designspace_name, datadir / "Test.stylespace"
+        )
+        expected = statmake.lib._generate_builder_data(
+            stylespace, varfont, additional_locations
+        )
+        actual = statmake.lib._generate_builder_data(
+            stylespace, varfont, additional_locations, stylespace_index
+        )
+        assert actual == expected
+
+
+def test_apply_with_stylespace_index_of_other_stylespace(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    stylespace = statmake.classes.Stylespace.from_file(
+        datadir / "TestMultilingual.stylespace"
+    )
+    other_index = statmake.lib.StylespaceIndex.from_stylespace(
+        statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    )
+    with pytest.raises(ValueError, match="different Stylespace"):
+        statmake.lib.apply_stylespace_to_variable_font(
+            stylespace, varfont, {}, stylespace_index=other_index
+        )
+
+    # An index of an equal Stylespace, e.g. one sent to another process, works.
+    equal_index = statmake.lib.StylespaceIndex.from_stylespace(
+        statmake.classes.Stylespace.from_file(datadir / "TestMultilingual.stylespace")
+    )
+    assert statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, varfont, {}, stylespace_index=equal_index
+    )
+
+
+@pytest.mark.parametrize(
+    "axis_stops",
+    [
+        {"wght": {333.0, 650.0}, "ital": {0.5, 1.0}},
+        {"wght": {333.0, 400.0, 650.0}, "ital": {1.0}},
+        {"wght": {333.0}, "ital": {0.5}},
+        {"wght": {333.0, 650.0}},
+        {},
+    ],
+)
+def test_applicable_named_locations(datadir, axis_stops):
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(stylespace)
+    expected = [
+        location_id
+        for location_id, named_location in enumerate(stylespace_index.named_locations)
+        if all(
+            v in axis_stops.get(k, set()) for k, v in named_location["location"].items()
+        )
+    ]
+    assert (
+        statmake.lib._applicable_named_locations(stylespace_index, axis_stops)
+        == expected
+    )
+
+
+def test_variable_fonts_from_designspace(datadir):
+    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+        datadir / "TestVariableFonts.designspace"
+    )
+    designspace.addVariableFont(
+        fontTools.designspaceLib.VariableFontDescriptor(
+            name="Test-Italic-Only",
+            axisSubsets=[
+                fontTools.designspaceLib.RangeAxisSubsetDescriptor(name="Italic")
+            ],
+            lib={"org.statmake.additionalLocations": {"Weight": 700}},
+        )
+    )
+    designspace.addVariableFont(
+        fontTools.designspaceLib.VariableFontDescriptor(
+            name="Test-Italic-Default", axisSubsets=[]
+        )
+    )
+
+    assert statmake.lib.variable_fonts_from_designspace(designspace) == [
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Upright", "Test-Upright.ttf", {"Italic": 0}
+        ),
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Italic", "Test-Italic.ttf", {"Italic": 1}
+        ),
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Italic-Only", "Test-Italic-Only.ttf", {"Weight": 700}
+        ),
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Italic-Default",
+            "Test-Italic-Default.ttf",
+            {"Weight": 200, "Italic": 0},
+        ),
+    ]
+
+
+def test_variable_fonts_from_designspace_label_names(datadir):
+    # The axes are named "weight", a registered axis that gets the English name
+    # "Weight" in fvar, and "ital_axis" with the English label name "Italic".
+    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+        datadir / "TestVariableFontsLowercase.designspace"
+    )
+    designspace.addVariableFont(
+        fontTools.designspaceLib.VariableFontDescriptor(
+            name="Test-Italic-Default", axisSubsets=[]
+        )
+    )
+
+    assert statmake.lib.variable_fonts_from_designspace(designspace) == [
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Upright", "Test-Upright.ttf", {"Italic": 0}
+        ),
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Italic", "Test-Italic.ttf", {"Italic": 1}
+        ),
+        statmake.lib.DesignspaceVariableFont(
+            "Test-Italic-Default",
+            "Test-Italic-Default.ttf",
+            {"Weight": 200, "Italic": 0},
+        ),
+    ]
+
+
+def test_variable_fonts_from_designspace_4(datadir):
+    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+        datadir / "Test_Wght_Italic.designspace"
+    )
+
+    assert statmake.lib.variable_fonts_from_designspace(designspace) == [
+        statmake.lib.DesignspaceVariableFont(
+            "Test_Wght_Italic-VF", "Test_Wght_Italic-VF.ttf", {"Italic": 1}
+        )
+    ]
+
+
+def test_apply_instrumentation(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    recorder = statmake.lib.PhaseRecorder()
+
+    statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, varfont, {}, instrumentation=recorder
+    )
+
+    assert [phase["name"] for phase in recorder.phases] == [
+        "index_name_table",
+        "build_stylespace_index",
+        "sanity_check",
+        "generate_builder_data",
+        "compile_tables_before",
+        "resolve_names",
+        "build_stat_table",
+        "compile_tables_after",
+    ]
+    counts = {phase["name"]: phase["counts"] for phase in recorder.phases}
+    assert counts["resolve_names"]["name_records_added"] > 0
+    assert counts["build_stat_table"]["format4_locations"] == 2
+
+
+@pytest.mark.parametrize("recompile", [False, True])
+def test_apply_to_font_bytes(datadir, tmp_path, recompile):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    varfont.save(tmp_path / "varfont.ttf")
+    data = (tmp_path / "varfont.ttf").read_bytes()
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+
+    output = statmake.lib.apply_stylespace_to_font_bytes(
+        stylespace, data, recompile=recompile
+    )
+    statmake.lib.apply_stylespace_to_font_file(
+        stylespace, tmp_path / "varfont.ttf", recompile=recompile
+    )
+    # Compare the raw tables, the head table's timestamp can differ with recompile.
+    output_font = fontTools.ttLib.TTFont(io.BytesIO(output))
+    expected_font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    assert sorted(output_font.reader.tables) == sorted(expected_font.reader.tables)
+    for tag in ("fvar", "name", "STAT", "glyf"):
+        assert output_font.reader[tag] == expected_font.reader[tag]
+
+    # Already up to date.
+    assert (
+        statmake.lib.apply_stylespace_to_font_bytes(
+            stylespace, output, recompile=recompile
+        )
+        is output
+    )
+
+
+def _stylespace_with_issues(datadir):
+    """Return Test.stylespace without the Light and Semi Bold weights and with a
+    duplicate Black, unvalidated."""
+    stylespace_dict = statmake.classes.Stylespace.from_file(
+        datadir / "Test.stylespace"
+    ).to_dict()
+    weight = stylespace_dict["axes"][0]
+    weight["locations"] = [
+        location
+        for location in weight["locations"]
+        if location["value"] not in (300, 600)
+    ]
+    weight["locations"].append({"name": "Heavy", "value": 900})
+    return statmake.classes.Stylespace.from_dict(stylespace_dict, validate=False)
+
+
+def test_find_issues(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    stylespace = _stylespace_with_issues(datadir)
+
+    issues = statmake.lib.find_issues(stylespace, varfont, {})
+    assert [
+        (issue.kind, issue.axis, issue.value, issue.location) for issue in issues
+    ] == [
+        ("duplicate_value", "Weight", 900, "Heavy"),
+        ("missing_stop", "Weight", 300, "Light"),
+        ("missing_stop", "Weight", 600, "Semi Bold"),
+    ]
+    with pytest.raises(StylespaceError, match=r"location 'Heavy' specifies") as e:
+        statmake.classes.Stylespace.from_dict(stylespace.to_dict())
+    assert e.value.issues == tuple(issues[:1])
+
+    # Applying checks the font and reports all its issues at once.
+    with pytest.raises(Error, match=r"stop 300.0 .* \(1 more issue found\)") as e:
+        statmake.lib.apply_stylespace_to_variable_font(stylespace, varfont, {})
+    assert e.value.issues == tuple(issues[1:])
+
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    assert statmake.lib.find_issues(stylespace, varfont, {}) == []
+    assert [
+        (issue.kind, issue.axis, issue.value)
+        for issue in statmake.lib.find_issues(stylespace, varfont, {"Foo": 1, "Bar": 2})
+    ] == [
+        ("unknown_additional_axis", "Foo", 1),
+        ("unknown_additional_axis", "Bar", 2),
+    ]
+
+
+def test_find_issues_unspecified_axes(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_Wght_Upright.designspace"
+        )
+    )
+    stylespace_dict = statmake.classes.Stylespace.from_file(
+        datadir / "Test.stylespace"
+    ).to_dict()
+    stylespace_dict["axes"].append(
+        {
+            "name": "Width",
+            "tag": "wdth",
+            "locations": [{"name": "Normal", "value": 100}],
+            "ordering": 2,
+        }
+    )
+    for location in stylespace_dict.get("locations", []):
+        location["axis_values"]["Width"] = 100
+    stylespace = statmake.classes.Stylespace.from_dict(stylespace_dict)
+
+    issues = statmake.lib.find_issues(stylespace, varfont, {})
+    assert [
+        (issue.kind, issue.axis) for issue in issues if issue.kind == "unspecified_axis"
+    ] == [("unspecified_axis", "Italic"), ("unspecified_axis", "Width")]
+
+
+def test_instance_stops_match_reporting_loop(datadir, monkeypatch):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    stylespace_index = statmake.lib.StylespaceIndex.from_stylespace(
+        statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    )
+
+    def axis_stops():
+        return statmake.lib._axis_stops(
+            varfont,
+            {},
+            stylespace_index.name_to_tag,
+            stylespace_index.stylespace_stops,
+            None,
+            [],
+        )
+
+    instance_stops = statmake.lib._instance_stops(
+        varfont["fvar"], stylespace_index.stylespace_stops
+    )
+    assert instance_stops is not None
+    assert instance_stops.keys() == {"wght", "ital"}
+    assert axis_stops() == instance_stops
+    monkeypatch.setattr(statmake.lib, "_instance_stops", lambda *_: None)
+    assert axis_stops() == instance_stops
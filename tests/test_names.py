@@ -0,0 +1,178 @@
+import fontTools.colorLib.builder
+import fontTools.designspaceLib
+import fontTools.otlLib.builder
+import pytest
+
+import statmake.classes
+import statmake.lib
+import statmake.names
+
+from . import testutil
+
+
+@pytest.mark.parametrize(
+    "stylespace_name", ["Test.stylespace", "TestMultilingual.stylespace"]
+)
+@pytest.mark.parametrize("mac_names", [False, True])
+@pytest.mark.parametrize("reapply", [False, True])
+def test_indexed_names_match_build_stat_table(
+    datadir, stylespace_name, mac_names, reapply
+):
+    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+        datadir / "Test_WghtItal.designspace"
+    )
+    stylespace = statmake.classes.Stylespace.from_file(datadir / stylespace_name)
+    varfont = testutil.build_variable_font(designspace)
+    if reapply:
+        # Names from a previous run are reused rather than added again.
+        statmake.lib.apply_stylespace_to_variable_font(
+            stylespace, varfont, {}, mac_names=mac_names
+        )
+    expected_font = testutil.reload_font(varfont)
+    actual_font = testutil.reload_font(varfont)
+
+    fontTools.otlLib.builder.buildStatTable(
+        expected_font,
+        *statmake.lib._generate_builder_data(stylespace, expected_font, {}),
+        macNames=mac_names,
+    )
+    statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, actual_font, {}, mac_names=mac_names
+    )
+
+    for tag in ("STAT", "name"):
+        assert actual_font[tag].compile(actual_font) == expected_font[tag].compile(
+            expected_font
+        )
+
+
+def test_name_table_index_add_multilingual_name(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    expected_font = testutil.reload_font(varfont)
+    actual_font = testutil.reload_font(varfont)
+    name_index = statmake.names.NameTableIndex(actual_font)
+
+    for names, mac, min_name_id in [
+        ({"en": "Weight"}, False, 256),
+        ({"en": "Weight"}, False, 0),
+        ({"en": "Regular", "de": "Normal"}, True, 0),
+        ({"en": "Regular", "de": "Normal"}, True, 0),
+        ({"en": "Regular", "de": "Normal"}, False, 0),
+        # No Windows language code, falls back to a Mac name and an ltag table.
+        ({"en": "Thin", "x-foo": "Foo"}, False, 0),
+        ({}, False, 0),
+    ]:
+        expected = expected_font["name"].addMultilingualName(
+            names, ttFont=expected_font, mac=mac, minNameID=min_name_id
+        )
+        assert name_index.add_multilingual_name(names, True, mac, min_name_id) == (
+            expected
+        )
+
+    assert actual_font["name"].compile(actual_font) == expected_font["name"].compile(
+        expected_font
+    )
+    assert actual_font["ltag"].tags == expected_font["ltag"].tags
+    assert name_index.get_name(1, 3, 1, 0x409) is actual_font["name"].getName(
+        1, 3, 1, 0x409
+    )
+    assert name_index.get_name(1, 3, 1, 0x407) is None
+
+
+def test_compact_name_table(datadir):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    # Switching Stylespaces leaves the names of the first one behind.
+    statmake.lib.apply_stylespace_to_variable_font(
+        statmake.classes.Stylespace.from_file(datadir / "Test.stylespace"), varfont, {}
+    )
+    statmake.lib.apply_stylespace_to_variable_font(
+        statmake.classes.Stylespace.from_file(datadir / "TestMultilingual.stylespace"),
+        varfont,
+        {},
+    )
+    # A copy of the fvar axis name, as e.g. another tool might have added it.
+    name_table = varfont["name"]
+    weight_name_id = varfont["fvar"].axes[0].axisNameID
+    duplicate_name_id = max(record.nameID for record in name_table.names) + 1
+    for record in list(name_table.names):
+        if record.nameID == weight_name_id:
+            name_table.setName(
+                record.toUnicode(),
+                duplicate_name_id,
+                record.platformID,
+                record.platEncID,
+                record.langID,
+            )
+    stat = varfont["STAT"].table
+    stat.DesignAxisRecord.Axis[0].AxisNameID = duplicate_name_id
+    axes_before = testutil.dump_axes(varfont, stat.DesignAxisRecord.Axis)
+    axis_values_before = testutil.dump_axis_values(
+        varfont, stat.AxisValueArray.AxisValue
+    )
+    size_before = len(name_table.compile(varfont))
+
+    bytes_saved = statmake.names.compact_name_table(varfont)
+
+    assert bytes_saved > 0
+    assert bytes_saved == size_before - len(name_table.compile(varfont))
+    assert stat.DesignAxisRecord.Axis[0].AxisNameID == weight_name_id
+    assert testutil.dump_axes(varfont, stat.DesignAxisRecord.Axis) == axes_before
+    assert (
+        testutil.dump_axis_values(varfont, stat.AxisValueArray.AxisValue)
+        == axis_values_before
+    )
+    referenced = {stat.ElidedFallbackNameID}
+    referenced.update(axis.AxisNameID for axis in stat.DesignAxisRecord.Axis)
+    referenced.update(value.ValueNameID for value in stat.AxisValueArray.AxisValue)
+    referenced.update(axis.axisNameID for axis in varfont["fvar"].axes)
+    referenced.update(
+        instance.subfamilyNameID for instance in varfont["fvar"].instances
+    )
+    assert {record.nameID for record in name_table.names if record.nameID >= 256} == {
+        name_id for name_id in referenced if name_id >= 256
+    }
+    assert statmake.names.compact_name_table(varfont) == 0
+
+
+def test_compact_name_table_keeps_names_of_other_tables(datadir, tmp_path):
+    varfont = testutil.build_variable_font(
+        fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+            datadir / "Test_WghtItal.designspace"
+        )
+    )
+    varfont["CPAL"] = fontTools.colorLib.builder.buildCPAL(
+        [[(1.0, 0.0, 0.0, 1.0)]],
+        paletteLabels=[{"en": "Red"}],
+        nameTable=varfont["name"],
+    )
+    palette_name_id = varfont["CPAL"].paletteLabels[0]
+    orphan_name_id = varfont["name"].addMultilingualName({"en": "Orphan"})
+    varfont.save(tmp_path / "varfont.ttf")
+
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    recorder = statmake.lib.PhaseRecorder()
+    font = statmake.lib.load_font_for_patching(tmp_path / "varfont.ttf")
+    assert statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, font, {}, instrumentation=recorder, compact_names=True
+    )
+
+    name_ids = {record.nameID for record in font["name"].names}
+    assert palette_name_id in name_ids
+    assert orphan_name_id not in name_ids
+    # CPAL was only peeked at and is copied through unchanged.
+    assert not font.isLoaded("CPAL")
+    [counts] = [
+        phase["counts"]
+        for phase in recorder.phases
+        if phase["name"] == "compact_name_table"
+    ]
+    assert counts["name_records_removed"] > 0
+    assert counts["bytes_saved"] > 0
@@ -0,0 +1,123 @@
+import os
+import tracemalloc
+
+import fontTools.ttLib
+import pytest
+
+import statmake.classes
+import statmake.lib
+
+from . import testutil
+
+
+def test_save_patched_matches_full_save(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "varfont.ttf")
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+    additional_locations = {"Italic": 0}
+
+    font_full = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, font_full, additional_locations
+    )
+    font_full.save(tmp_path / "full.ttf")
+
+    font_patched = statmake.lib.load_font_for_patching(tmp_path / "varfont.ttf")
+    statmake.lib.apply_stylespace_to_variable_font(
+        stylespace, font_patched, additional_locations
+    )
+    loaded_tables = set(filter(font_patched.isLoaded, font_patched.keys()))
+    assert loaded_tables <= {"fvar", "name", "STAT"}
+    statmake.lib.save_patched(font_patched, tmp_path / "patched.ttf")
+
+    original = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    full = fontTools.ttLib.TTFont(tmp_path / "full.ttf")
+    patched = fontTools.ttLib.TTFont(tmp_path / "patched.ttf", checkChecksums=2)
+    assert sorted(patched.keys()) == sorted(full.keys())
+    for tag in ("fvar", "name", "STAT"):
+        assert patched.reader[tag] == full.reader[tag]
+    for tag in patched.reader.tables:
+        if tag in ("head", "name", "STAT"):
+            continue
+        assert patched.reader[tag] == original.reader[tag]
+    # Everything but the checksum adjustment is carried over in the head table.
+    assert patched.reader["head"][12:] == original.reader["head"][12:]
+    assert patched["head"].checkSumAdjustment == _checksum_adjustment(
+        tmp_path / "patched.ttf"
+    )
+
+
+def _checksum_adjustment(font_path):
+    data = bytearray(font_path.read_bytes())
+    font = fontTools.ttLib.TTFont(font_path)
+    head_offset = font.reader.tables["head"].offset
+    data[head_offset + 8 : head_offset + 12] = b"\0\0\0\0"
+    return (0xB1B0AFBA - fontTools.ttLib.sfnt.calcChecksum(bytes(data))) & 0xFFFFFFFF
+
+
+def test_patch_large_font_in_place(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    # Stand-ins for big outline tables that statmake never needs to look at.
+    filler_tags = [f"zz{index:02}" for index in range(16)]
+    for index, tag in enumerate(filler_tags):
+        table = fontTools.ttLib.newTable(tag)
+        table.data = bytes([index]) * 1024 * 1024
+        varfont[tag] = table
+    font_path = tmp_path / "varfont.ttf"
+    varfont.save(font_path)
+    font_size = font_path.stat().st_size
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+
+    tracemalloc.start()
+    try:
+        assert statmake.lib.apply_stylespace_to_font_file(
+            stylespace, font_path, additional_locations={"Italic": 0}
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The input is mapped and the output streamed, so no more than about one
+    # filler table is held in memory at a time.
+    assert peak < font_size / 4
+
+    patched = fontTools.ttLib.TTFont(font_path, checkChecksums=2)
+    assert "STAT" in patched
+    for index, tag in enumerate(filler_tags):
+        assert patched.reader[tag] == bytes([index]) * 1024 * 1024
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="Needs symlinks.")
+def test_patch_through_symlink(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "real.ttf")
+    (tmp_path / "link.ttf").symlink_to("real.ttf")
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+
+    assert statmake.lib.apply_stylespace_to_font_file(
+        stylespace, tmp_path / "link.ttf", additional_locations={"Italic": 0}
+    )
+
+    assert (tmp_path / "link.ttf").is_symlink()
+    patched = fontTools.ttLib.TTFont(tmp_path / "real.ttf")
+    v = testutil.dump_axis_values(
+        patched, patched["STAT"].table.AxisValueArray.AxisValue
+    )
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_patch_hardlinked_font(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    varfont.save(tmp_path / "a.ttf")
+    os.link(tmp_path / "a.ttf", tmp_path / "b.ttf")
+    stylespace = statmake.classes.Stylespace.from_file(datadir / "Test.stylespace")
+
+    assert statmake.lib.apply_stylespace_to_font_file(
+        stylespace, tmp_path / "a.ttf", additional_locations={"Italic": 0}
+    )
+
+    assert os.path.samefile(tmp_path / "a.ttf", tmp_path / "b.ttf")
+    patched = fontTools.ttLib.TTFont(tmp_path / "b.ttf", checkChecksums=2)
+    assert "STAT" in patched
+    assert not list(tmp_path.glob("*.tmp"))
@@ -1,9 +1,147 @@
+import json
 from pathlib import Path
+from typing import Any
 
-from statmake.classes import Stylespace
+import fontTools.misc.plistlib
+import pytest
+from fontTools.designspaceLib import DesignSpaceDocument
+
+import statmake.classes
+from statmake.classes import DESIGNSPACE_STYLESPACE_INLINE_KEY, Stylespace
+from statmake.errors import StylespaceError
 
 
 def test_serialize(datadir: Path) -> None:
     stylespace = Stylespace.from_file(datadir / "Test.stylespace")
     stylespace_rt = Stylespace.from_dict(stylespace.to_dict())
     assert stylespace == stylespace_rt
+
+
+def test_from_dict_detailed_validation(datadir: Path) -> None:
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    stylespace_detailed = Stylespace.from_file(
+        datadir / "Test.stylespace", detailed_validation=True
+    )
+    assert stylespace == stylespace_detailed
+
+
+def test_json(datadir: Path) -> None:
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    assert Stylespace.from_file(datadir / "Test.stylespace.json") == stylespace
+
+    data = json.dumps(stylespace.to_dict()).encode("utf-8")
+    assert Stylespace.from_bytes(data) == stylespace
+    assert Stylespace.from_bytes(b"\xef\xbb\xbf\n" + data) == stylespace
+
+
+def test_json_inline(datadir: Path) -> None:
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    designspace = DesignSpaceDocument.fromfile(
+        datadir / "TestInlineStylespace.designspace"
+    )
+    designspace.lib[DESIGNSPACE_STYLESPACE_INLINE_KEY] = json.dumps(
+        stylespace.to_dict()
+    )
+    assert Stylespace.from_designspace(designspace) == stylespace
+
+    designspace.lib[DESIGNSPACE_STYLESPACE_INLINE_KEY] = '{"axes": ['
+    with pytest.raises(StylespaceError, match="inline Stylespace"):
+        Stylespace.from_designspace(designspace)
+
+
+def _load(path: Path, streaming: bool) -> object:
+    try:
+        return Stylespace.from_file(path, streaming=streaming)
+    except (StylespaceError, ValueError) as e:
+        return (type(e), str(e))
+
+
+def test_streaming_matches_reading_in_one_go(datadir: Path) -> None:
+    paths = sorted(datadir.glob("*.stylespace*"))
+    assert paths
+    for path in paths:
+        assert _load(path, streaming=True) == _load(path, streaming=False), path
+
+
+def test_streaming_selected_by_size(
+    datadir: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("Large plist files must not be read in one go.")
+
+    monkeypatch.setattr(statmake.classes, "STREAMING_MIN_SIZE", 0)
+    monkeypatch.setattr(fontTools.misc.plistlib, "loads", fail)
+    assert Stylespace.from_file(datadir / "Test.stylespace") == stylespace
+    assert (
+        Stylespace.from_file(datadir / "Test.stylespace", cache_dir=tmp_path)
+        == stylespace
+    )
+    # JSON files have no streaming parser.
+    assert Stylespace.from_file(datadir / "Test.stylespace.json") == stylespace
+
+
+def test_streaming_errors(tmp_path: Path) -> None:
+    path = tmp_path / "Test.stylespace"
+    path.write_bytes(b"<plist><dict><key>axes</key><data>AA==</data></dict></plist>")
+    with pytest.raises(StylespaceError, match="Unsupported plist element <data>"):
+        Stylespace.from_file(path, streaming=True)
+    path.write_bytes(b"<plist><dict><key>locations</key><array/></dict></plist>")
+    with pytest.raises(StylespaceError, match="must contain 'axes'"):
+        Stylespace.from_file(path, streaming=True)
+    path.write_bytes(b"<plist><dict>")
+    with pytest.raises(SyntaxError):
+        Stylespace.from_file(path, streaming=True)
+
+
+def test_to_bytes_round_trip(datadir: Path, tmp_path: Path) -> None:
+    for name in ("Test.stylespace", "TestMultilingual.stylespace"):
+        stylespace = Stylespace.from_file(datadir / name)
+        assert Stylespace.from_bytes(stylespace.to_bytes()) == stylespace
+        assert Stylespace.from_bytes(stylespace.to_bytes(as_json=True)) == stylespace
+
+        stylespace.to_file(tmp_path / name)
+        assert Stylespace.from_file(tmp_path / name, streaming=True) == stylespace
+        stylespace.to_file(tmp_path / f"{name}.json")
+        assert (tmp_path / f"{name}.json").read_bytes().startswith(b"{")
+        assert Stylespace.from_file(tmp_path / f"{name}.json") == stylespace
+
+
+def test_to_bytes_canonical(datadir: Path) -> None:
+    stylespace = Stylespace.from_file(datadir / "TestMultilingual.stylespace")
+    data = stylespace.to_dict()
+    data_reordered = _reorder_dicts(data)
+    assert list(data_reordered) != list(data)
+    stylespace_reordered = Stylespace.from_dict(data_reordered)
+
+    assert stylespace_reordered.to_bytes() == stylespace.to_bytes()
+    assert stylespace_reordered.to_bytes(as_json=True) == stylespace.to_bytes(
+        as_json=True
+    )
+    assert stylespace_reordered.fingerprint() == stylespace.fingerprint()
+
+
+def _reorder_dicts(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {key: _reorder_dicts(data[key]) for key in reversed(list(data))}
+    if isinstance(data, list):
+        return [_reorder_dicts(value) for value in data]
+    return data
+
+
+def test_fingerprint(datadir: Path) -> None:
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    # Fingerprints must stay the same across versions, change this only together
+    # with FINGERPRINT_VERSION.
+    assert stylespace.fingerprint() == (
+        "40fe8823d1621be766784326ad0ab3299debbb0f6974c54e2ae49e25bb46cdf9"
+    )
+    assert (
+        Stylespace.from_file(datadir / "Test.stylespace.json").fingerprint()
+        == stylespace.fingerprint()
+    )
+
+    data = stylespace.to_dict()
+    data["locations"][0]["axis_values"]["Weight"] = 334
+    assert Stylespace.from_dict(data).fingerprint() != stylespace.fingerprint()
@@ -0,0 +1,239 @@
+import os
+import shutil
+import socket
+import socketserver
+import threading
+
+import fontTools.ttLib
+import pytest
+
+import statmake.client
+
+from . import testutil
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socketserver, "UnixStreamServer"),
+    reason="Needs Unix domain sockets.",
+)
+
+
+@pytest.fixture
+def server(tmp_path):
+    import statmake.server
+
+    server = statmake.server.Server(tmp_path / "statmake.sock")
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_server_jobs(datadir, server, tmp_path):
+    shutil.copy(datadir / "Test.stylespace", tmp_path / "Test.stylespace")
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    (tmp_path / "out").mkdir()
+
+    statmake.client.main(
+        [
+            "--socket",
+            server.server_address,
+            "-m",
+            str(datadir / "Test_Wght_Upright.designspace"),
+            "--stylespace",
+            str(tmp_path / "Test.stylespace"),
+            "--output-dir",
+            str(tmp_path / "out"),
+            str(tmp_path / "varfont.ttf"),
+        ]
+    )
+
+    font = fontTools.ttLib.TTFont(tmp_path / "out" / "varfont.ttf")
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+    job = {
+        "font": str(tmp_path / "varfont.ttf"),
+        "designspace": str(datadir / "Test_Wght_Upright.designspace"),
+        "stylespace": str(tmp_path / "Test.stylespace"),
+    }
+    client = statmake.client.Client(server.server_address)
+    try:
+        assert list(client.submit([job, job])) == [
+            {"ok": True, "written": True},
+            {"ok": True, "written": False},
+        ]
+        assert (server.stylespaces.hits, server.stylespaces.misses) == (2, 1)
+
+        # A touched but unchanged file is not parsed again.
+        os.utime(tmp_path / "Test.stylespace", ns=(0, 0))
+        assert list(client.submit([job])) == [{"ok": True, "written": False}]
+        assert (server.stylespaces.hits, server.stylespaces.misses) == (3, 1)
+
+        # A changed file is.
+        (tmp_path / "Test.stylespace").write_text("<plist>", encoding="utf-8")
+        [response] = client.submit([job])
+        assert not response["ok"]
+        assert server.stylespaces.misses == 2
+    finally:
+        client.close()
+
+
+def test_server_inline_stylespace(datadir, server, tmp_path):
+    testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace").save(
+        tmp_path / "varfont.ttf"
+    )
+    job = {
+        "font": str(tmp_path / "varfont.ttf"),
+        "designspace": str(datadir / "TestInlineStylespace.designspace"),
+    }
+
+    client = statmake.client.Client(server.server_address)
+    try:
+        assert list(client.submit([job, job])) == [
+            {"ok": True, "written": True},
+            {"ok": True, "written": False},
+        ]
+    finally:
+        client.close()
+    assert (server.designspaces.hits, server.designspaces.misses) == (1, 1)
+
+    font = fontTools.ttLib.TTFont(tmp_path / "varfont.ttf")
+    v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+    assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+def test_server_bad_jobs(datadir, server, tmp_path, caplog):
+    client = statmake.client.Client(server.server_address)
+    try:
+        responses = list(
+            client.submit(
+                [
+                    {"font": str(tmp_path / "varfont.ttf")},
+                    {"font": 1, "designspace": "x"},
+                    {"font": "x", "designspace": "y", "bogus": True},
+                    {
+                        "font": str(tmp_path / "missing.ttf"),
+                        "designspace": str(
+                            datadir / "TestInlineStylespace.designspace"
+                        ),
+                    },
+                ]
+            )
+        )
+    finally:
+        client.close()
+    assert [response["ok"] for response in responses] == [False] * 4
+    assert "'designspace'" in responses[0]["error"]
+    assert "'font'" in responses[1]["error"]
+    assert "bogus" in responses[2]["error"]
+    assert "missing.ttf" in responses[3]["error"]
+
+    with pytest.raises(SystemExit):
+        statmake.client.main(
+            [
+                "--socket",
+                server.server_address,
+                "-m",
+                str(datadir / "TestInlineStylespace.designspace"),
+                str(tmp_path / "missing.ttf"),
+            ]
+        )
+    assert "missing.ttf" in caplog.text
+
+
+def test_cli_serve(monkeypatch):
+    import statmake.cli
+    import statmake.server
+
+    calls = []
+    monkeypatch.setattr(statmake.server, "main", calls.append)
+    statmake.cli.main(["serve", "--socket", "statmake.sock"])
+    assert calls == [["--socket", "statmake.sock"]]
+
+
+def test_file_cache_lru(tmp_path):
+    import statmake.server
+
+    cache = statmake.server.FileCache(lambda _, data: data, max_entries=2)
+    paths = [tmp_path / f"{i}.txt" for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"%d" % i)
+
+    assert cache.get(paths[0]) == b"0"
+    assert cache.get(paths[1]) == b"1"
+    assert cache.get(paths[0]) == b"0"
+    assert cache.get(paths[2]) == b"2"
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # The least recently used file was dropped, the others are still cached.
+    assert cache.get(paths[0]) == b"0"
+    assert cache.get(paths[2]) == b"2"
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert cache.get(paths[1]) == b"1"
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+def test_file_cache_slow_parse(tmp_path):
+    import statmake.server
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def parse(path, data):
+        if path.name == "slow.txt":
+            started.set()
+            assert release.wait(10)
+        return data
+
+    cache = statmake.server.FileCache(parse)
+    (tmp_path / "slow.txt").write_bytes(b"slow")
+    (tmp_path / "fast.txt").write_bytes(b"fast")
+    cache.get(tmp_path / "fast.txt")
+
+    thread = threading.Thread(target=cache.get, args=(tmp_path / "slow.txt",))
+    thread.start()
+    try:
+        assert started.wait(10)
+        # A hit on another file does not wait for the slow parse to finish.
+        assert cache.get(tmp_path / "fast.txt") == b"fast"
+        assert cache.hits == 1
+    finally:
+        release.set()
+        thread.join()
+    assert cache.get(tmp_path / "slow.txt") == b"slow"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_serve_refuses_socket_in_use(server, tmp_path, caplog):
+    import statmake.server
+
+    with pytest.raises(SystemExit):
+        statmake.server.main(["--socket", server.server_address])
+    assert "already listening" in caplog.text
+    assert os.path.exists(server.server_address)
+
+    # A socket left behind by a server that is gone can be taken over.
+    stale_path = tmp_path / "stale.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(os.fspath(stale_path))
+    assert not statmake.server._socket_in_use(stale_path)
+
+
+def test_parse_designspace(datadir):
+    import fontTools.designspaceLib
+
+    import statmake.server
+
+    path = datadir / "TestExternalStylespace.designspace"
+    document = statmake.server._parse_designspace(path, path.read_bytes())
+    expected = fontTools.designspaceLib.DesignSpaceDocument.fromfile(path)
+    assert document.path == expected.path
+    assert document.lib == expected.lib
+    assert [source.path for source in document.sources] == [
+        source.path for source in expected.sources
+    ]
+    assert document.findDefault().path == expected.findDefault().path
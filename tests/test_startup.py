@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules that make up most of statmake's import time and are not needed to parse
+# the command line.
+HEAVY_MODULES = ("fontTools", "cattrs", "attrs", "attr", "concurrent", "socketserver")
+
+
+def imported_modules(*args):
+    """Run Python with `-X importtime` and return the names of all modules it
+    imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        name = line.rsplit("|", 1)[-1].strip()
+        if name != "package":  # The header line.
+            modules.add(name)
+    return modules
+
+
+@pytest.mark.parametrize(
+    "args",
+    [("-c", "import statmake.cli"), ("-m", "statmake", "--version")],
+    ids=["import", "version"],
+)
+def test_cli_startup_imports(args):
+    modules = imported_modules(*args)
+    assert "statmake.cli" in modules
+    heavy = sorted(
+        module for module in modules if module.split(".")[0] in HEAVY_MODULES
+    )
+    assert not heavy
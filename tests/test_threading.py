@@ -0,0 +1,123 @@
+import concurrent.futures
+import copy
+import pickle
+
+import attrs
+import fontTools.ttLib
+import pytest
+
+import statmake.lib
+from statmake.classes import (
+    Axis,
+    LocationFormat1,
+    LocationFormat2,
+    NameRecord,
+    Stylespace,
+)
+
+from . import testutil
+
+
+def test_stylespace_is_deeply_immutable(datadir):
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+
+    assert isinstance(stylespace.axes, tuple)
+    assert isinstance(stylespace.locations, tuple)
+    assert isinstance(stylespace.axes[0].locations, tuple)
+    assert isinstance(stylespace.axes[0].locations[0].flags.flags, tuple)
+    ranges = [
+        location.range
+        for axis in stylespace.axes
+        for location in axis.locations
+        if isinstance(location, LocationFormat2)
+    ]
+    assert ranges
+    assert all(isinstance(range_, tuple) for range_ in ranges)
+    with pytest.raises(attrs.exceptions.FrozenInstanceError):
+        stylespace.axes[0].ordering = 5  # type: ignore
+    with pytest.raises(TypeError):
+        stylespace.axes[0].name.mapping["en"] = "Width"  # type: ignore
+    with pytest.raises(TypeError):
+        stylespace.locations[0].axis_values["Weight"] = 100  # type: ignore
+
+    assert pickle.loads(pickle.dumps(stylespace)) == stylespace
+    assert copy.deepcopy(stylespace) == stylespace
+    assert Stylespace.from_dict(stylespace.to_dict()) == stylespace
+
+
+def test_stylespace_copies_its_input():
+    mapping = {"en": "Weight"}
+    axis = Axis(
+        name=NameRecord(mapping),
+        tag="wght",
+        locations=[LocationFormat1(name=NameRecord.from_string("Regular"), value=400)],
+    )
+    mapping["en"] = "Width"
+    assert axis.name.default == "Weight"
+
+    range_ = [700, 900]
+    location = LocationFormat2(
+        name=NameRecord.from_string("Black"), value=900, range=range_
+    )
+    range_[0] = 100
+    assert location.range == (700, 900)
+
+    # The default ordering is filled in on copies of shared axes.
+    stylespace = Stylespace([axis])
+    other_stylespace = Stylespace([axis, attrs.evolve(axis, tag="wdth")])
+    assert axis.ordering is None
+    assert [axis.ordering for axis in stylespace.axes] == [0]
+    assert [axis.ordering for axis in other_stylespace.axes] == [0, 1]
+
+
+def test_apply_stylespace_to_fonts(datadir, tmp_path):
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+    fonts = []
+    for index in range(8):
+        if index % 2:
+            fonts.append(testutil.reload_font(varfont))
+        else:
+            font_path = tmp_path / f"varfont{index}.ttf"
+            varfont.save(font_path)
+            fonts.append(font_path)
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    stylespace_dict = stylespace.to_dict()
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        assert (
+            statmake.lib.apply_stylespace_to_fonts(
+                stylespace, fonts, {"Italic": 0}, executor=executor
+            )
+            == [True] * 8
+        )
+    # Serially, nothing is left to do.
+    assert (
+        statmake.lib.apply_stylespace_to_fonts(stylespace, fonts, {"Italic": 0})
+        == [False] * 8
+    )
+
+    assert stylespace.to_dict() == stylespace_dict
+    for font in fonts:
+        if not isinstance(font, fontTools.ttLib.TTFont):
+            font = fontTools.ttLib.TTFont(font)
+        v = testutil.dump_axis_values(font, font["STAT"].table.AxisValueArray.AxisValue)
+        assert v == testutil.TEST_WGHT_UPRIGHT_STAT_DUMP
+
+
+def test_apply_stylespace_to_fonts_errors(datadir, tmp_path):
+    stylespace = Stylespace.from_file(datadir / "Test.stylespace")
+    varfont = testutil.empty_varfont(datadir / "Test_Wght_Upright.designspace")
+
+    executor = concurrent.futures.ProcessPoolExecutor(1)
+    with executor, pytest.raises(TypeError, match="paths"):
+        statmake.lib.apply_stylespace_to_fonts(stylespace, [varfont], executor=executor)
+
+    varfont.save(tmp_path / "varfont.ttf")
+    executor = concurrent.futures.ThreadPoolExecutor(2)
+    with executor, pytest.raises(OSError):
+        statmake.lib.apply_stylespace_to_fonts(
+            stylespace,
+            [tmp_path / "varfont.ttf", tmp_path / "missing.ttf"],
+            {"Italic": 0},
+            executor=executor,
+        )
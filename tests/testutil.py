@@ -91,6 +91,23 @@ def reload_font(font):
     return fontTools.ttLib.TTFont(buf)
 
 
+def build_variable_font(
+    designspace: fontTools.designspaceLib.DesignSpaceDocument,
+) -> fontTools.ttLib.TTFont:
+    for source in designspace.sources:
+        source.font = empty_UFO(source.styleName)
+    ufo2ft.compileInterpolatableTTFsFromDS(designspace, inplace=True)
+    varfont, _, _ = fontTools.varLib.build(designspace)
+    return varfont
+
+
+def empty_varfont(designspace_path: Path) -> fontTools.ttLib.TTFont:
+    designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
+        designspace_path
+    )
+    return build_variable_font(designspace)
+
+
 def generate_variable_font(
     designspace_path: Path,
     stylespace_path: Path,
@@ -100,10 +117,7 @@ def generate_variable_font(
     designspace = fontTools.designspaceLib.DesignSpaceDocument.fromfile(
         designspace_path
     )
-    for source in designspace.sources:
-        source.font = empty_UFO(source.styleName)
-    ufo2ft.compileInterpolatableTTFsFromDS(designspace, inplace=True)
-    varfont, _, _ = fontTools.varLib.build(designspace)
+    varfont = build_variable_font(designspace)
 
     stylespace = statmake.classes.Stylespace.from_file(stylespace_path)
     if additional_locations is None:
@@ -114,3 +128,42 @@ def generate_variable_font(
         stylespace, varfont, additional_locations, mac_names=mac_names
     )
     return reload_font(varfont)
+
+
+TEST_WGHT_UPRIGHT_STAT_DUMP = [
+    {"Format": 1, "Name": {"en": "XLight"}, "Flags": 0, "AxisIndex": 0, "Value": 200.0},
+    {"Format": 1, "Name": {"en": "Light"}, "Flags": 0, "AxisIndex": 0, "Value": 300.0},
+    {
+        "Format": 3,
+        "Name": {"en": "Regular"},
+        "Flags": 2,
+        "AxisIndex": 0,
+        "Value": 400.0,
+        "LinkedValue": 700.0,
+    },
+    {
+        "Format": 1,
+        "Name": {"en": "Semi Bold"},
+        "Flags": 0,
+        "AxisIndex": 0,
+        "Value": 600.0,
+    },
+    {"Format": 1, "Name": {"en": "Bold"}, "Flags": 0, "AxisIndex": 0, "Value": 700.0},
+    {
+        "Format": 2,
+        "Name": {"en": "Black"},
+        "Flags": 0,
+        "AxisIndex": 0,
+        "NominalValue": 900.0,
+        "RangeMinValue": 701.0,
+        "RangeMaxValue": 900.0,
+    },
+    {
+        "Format": 3,
+        "Name": {"en": "Upright"},
+        "Flags": 2,
+        "AxisIndex": 1,
+        "Value": 0.0,
+        "LinkedValue": 1.0,
+    },
+]